@@ -0,0 +1,121 @@
+"""
+Path: benchmarks/bench_context_cache.py
+Compara tokens de entrada facturados y latencia por solicitud con y sin caché del
+prefijo estático, pasando por GeminiService.send_message (historial, selección de
+modelo y ContextCacheManager). La API remota se reemplaza por un modelo local que
+factura los tokens que recibiría: instrucciones del sistema, historial y mensaje.
+El prefijo en caché se informa aparte, como hace usage_metadata.
+
+Requiere google-generativeai instalado; no realiza llamadas de red.
+
+Uso:
+    python -m benchmarks.bench_context_cache --requests 200 --prefix-words 6000
+"""
+
+import argparse
+import logging
+import time
+from types import SimpleNamespace
+import google.generativeai as genai
+from src.interfaces.context_cache_backend import IContextCacheBackend
+from src.services.context_cache import ContextCacheManager
+from src.services.gemini_service import GeminiService, DEFAULT_MODEL_NAME
+
+# Costo simulado del backend por token de entrada procesado.
+SECONDS_PER_TOKEN = 2e-7
+
+
+def count_tokens(text: str) -> int:
+    " Aproximación local: ~4 caracteres por token "
+    return max(1, len(text) // 4)
+
+
+class FakeGenerativeModel:
+    " Reemplazo local de genai.GenerativeModel que factura la entrada recibida "
+    usages = []  # usage_metadata de cada respuesta generada
+
+    def __init__(self, model_name, generation_config=None, system_instruction=None,
+                 cached_prefix: str = ""):
+        self.model_name = model_name
+        self.generation_config = generation_config
+        self.system_instruction = system_instruction or ""
+        self.cached_prefix = cached_prefix
+
+    def generate_content(self, contents, generation_config=None):
+        " Simula la llamada; el prefijo en caché no se reenvía ni se vuelve a procesar "
+        sent = self.system_instruction + "".join(
+            part for content in contents for part in content["parts"] if isinstance(part, str)
+        )
+        billed = count_tokens(sent)
+        cached = count_tokens(self.cached_prefix) if self.cached_prefix else 0
+        time.sleep(billed * SECONDS_PER_TOKEN)
+        usage = SimpleNamespace(
+            prompt_token_count=billed + cached,
+            cached_content_token_count=cached,
+            total_token_count=billed + cached + 4,
+        )
+        FakeGenerativeModel.usages.append(usage)
+        return SimpleNamespace(text="Respuesta breve.", usage_metadata=usage)
+
+
+class FakeCacheBackend(IContextCacheBackend):
+    " Backend falso en memoria "
+    def __init__(self):
+        self.prefixes = {}
+        self.created = 0
+
+    def create(self, model_name, system_instruction, documents, ttl_seconds) -> str:
+        self.created += 1
+        handle = f"cachedContents/{self.created}"
+        self.prefixes[handle] = system_instruction + "".join(documents)
+        return handle
+
+    def refresh(self, handle, ttl_seconds) -> None:
+        pass
+
+    def delete(self, handle) -> None:
+        self.prefixes.pop(handle, None)
+
+    def build_model(self, handle, model_name):
+        return FakeGenerativeModel(model_name, cached_prefix=self.prefixes[handle])
+
+
+def measure(label: str, service: GeminiService, requests: int) -> None:
+    " Envía las solicitudes por GeminiService e imprime tokens y latencia medios "
+    FakeGenerativeModel.usages = []
+    start = time.perf_counter()
+    for i in range(requests):
+        # Cada pregunta es independiente: se aísla el costo del prefijo del historial.
+        service.history_contents.clear()
+        service.send_message(f"Pregunta de prueba número {i} sobre el tema.")
+    elapsed = time.perf_counter() - start
+    usages = FakeGenerativeModel.usages
+    billed = sum(u.prompt_token_count - u.cached_content_token_count for u in usages)
+    cached = sum(u.cached_content_token_count for u in usages)
+    print(f"{label:10s} tokens_entrada_medios={billed / len(usages):.0f} "
+          f"tokens_en_cache_medios={cached / len(usages):.0f} "
+          f"latencia_media={elapsed / requests * 1000:.2f}ms")
+
+
+def run(requests: int, prefix_words: int) -> None:
+    " Ejecuta ambos modos con el mismo prefijo "
+    instructions = "Sos un asistente docente. " + "material " * prefix_words
+    logger = logging.getLogger("bench_context_cache")
+    # GeminiService construye el modelo sin caché con genai.GenerativeModel.
+    genai.GenerativeModel = FakeGenerativeModel
+
+    measure("sin_cache", GeminiService("bench", instructions, logger), requests)
+
+    backend = FakeCacheBackend()
+    manager = ContextCacheManager(backend, ttl_seconds=3600)
+    manager.set_context(instructions)
+    measure("con_cache", GeminiService("bench", instructions, logger, manager), requests)
+    print(f"modelo={DEFAULT_MODEL_NAME} prefijos_registrados={backend.created}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--prefix-words", type=int, default=6000)
+    args = parser.parse_args()
+    run(args.requests, args.prefix_words)
@@ -0,0 +1,64 @@
+"""
+Path: benchmarks/bench_execution_lanes.py
+Mide la latencia (encolado -> fin) de las respuestas inmediatas mientras el carril
+de generaciones largas está saturado, comparando carriles separados contra un
+único pool compartido.
+
+Uso:
+    python -m benchmarks.bench_execution_lanes --long-tasks 64 --fast-tasks 200
+"""
+
+import argparse
+import time
+from concurrent.futures import wait
+from src.services.execution_lanes import ExecutionLanes, INSTANT, SHORT, LONG
+
+
+def long_generation(seconds: float) -> None:
+    " Simula una generación larga de Gemini (E/S de red, libera el GIL) "
+    time.sleep(seconds)
+
+
+def instant_reply() -> str:
+    " Simula una respuesta fija (mensaje de prueba o comando) "
+    return "¡Hola! ¿Cómo puedo ayudarte? <modo test>."
+
+
+def measure(label: str, lanes: ExecutionLanes, fast_lane: str,
+            long_tasks: int, fast_tasks: int, long_seconds: float) -> None:
+    " Satura el carril largo y mide la latencia del carril rápido "
+    long_futures = [lanes.submit(LONG, long_generation, long_seconds) for _ in range(long_tasks)]
+    time.sleep(0.05)
+    fast_futures, latencies = [], []
+    for _ in range(fast_tasks):
+        enqueued = time.perf_counter()
+        future = lanes.submit(fast_lane, instant_reply)
+        future.add_done_callback(
+            lambda _, start=enqueued: latencies.append((time.perf_counter() - start) * 1000)
+        )
+        fast_futures.append(future)
+        time.sleep(0.002)
+    wait(fast_futures, timeout=long_tasks * long_seconds + 5)
+    latencies.sort()
+    print(f"{label:18s} p50={latencies[len(latencies) // 2]:.2f}ms "
+          f"p95={latencies[int(len(latencies) * 0.95)]:.2f}ms completados={len(latencies)}")
+    for future in long_futures:
+        future.cancel()
+    lanes.shutdown(wait=False)
+
+
+def run(long_tasks: int, fast_tasks: int, long_seconds: float) -> None:
+    " Ejecuta ambos escenarios "
+    measure("carriles", ExecutionLanes(), INSTANT, long_tasks, fast_tasks, long_seconds)
+    # Un único pool compartido: todo se encola en el mismo carril.
+    shared = ExecutionLanes({INSTANT: 1, SHORT: 1, LONG: 12})
+    measure("pool_compartido", shared, LONG, long_tasks, fast_tasks, long_seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--long-tasks", type=int, default=64)
+    parser.add_argument("--fast-tasks", type=int, default=200)
+    parser.add_argument("--long-seconds", type=float, default=0.5)
+    args = parser.parse_args()
+    run(args.long_tasks, args.fast_tasks, args.long_seconds)
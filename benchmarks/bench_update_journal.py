@@ -0,0 +1,147 @@
+"""
+Path: benchmarks/bench_update_journal.py
+Mide la latencia de cada append durable del journal (percentiles por llamada, que es
+lo que espera el hilo del webhook antes de responder) con varios hilos concurrentes,
+y la compara con el costo de un fsync aislado en el mismo directorio. El throughput
+(updates/s) se informa aparte: con group commit varios appends comparten un fsync,
+pero cada uno espera al menos uno, por lo que la latencia por append queda acotada
+por la del fsync del disco.
+
+Usar --dir para medir sobre el disco real donde vive JOURNAL_DIR (por defecto se usa
+un directorio temporal, que puede estar en tmpfs).
+
+Referencia (ext4 sobre disco virtual, 1000 updates, --dir en el disco del servidor):
+    fsync aislado        500/s p50 ~85us   p95 ~290us
+    fsync aislado     saturado p50 ~61us   p95 ~65us
+    journal 1 hilo       500/s p50 ~115us  p95 ~230us
+    journal 1 hilo    saturado p50 ~70us   p95 ~95us
+    journal 8 hilos      500/s p50 ~135us  p95 ~440us
+    journal 8 hilos   saturado p50 ~335us  p95 ~500us  (~22000 updates/s)
+El costo propio del journal es de ~10-30us por append sobre el fsync; con 8 hilos
+saturando, la latencia incluye la espera del fsync en curso y la contención del GIL.
+En un HDD o un disco de red el fsync domina (milisegundos) y el group commit es lo
+que sostiene el throughput.
+
+Uso:
+    python -m benchmarks.bench_update_journal --threads 1 8 --updates 2000 --dir data/journal
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from typing import List
+from src.services.update_journal import UpdateJournal
+
+SAMPLE_UPDATE = {
+    "update_id": 123456789,
+    "message": {
+        "message_id": 42,
+        "from": {"id": 1, "is_bot": False, "first_name": "Alumno"},
+        "chat": {"id": 1, "type": "private", "first_name": "Alumno"},
+        "date": 1700000000,
+        "text": "¿Podés explicarme la ley de Ohm?",
+    },
+}
+
+
+def percentile(samples: List[float], q: float) -> float:
+    " Percentil q (0..1) de una lista ordenada "
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def measure_fsync(directory: str, iterations: int = 200, rate: float = 0.0) -> List[float]:
+    """
+    Mide la latencia (us) de escribir una línea y hacer fsync en el directorio, sin
+    pausa o pautando las escrituras a rate por segundo (un disco ocioso suele tardar más).
+    """
+    latencies = []
+    path = os.path.join(directory, "fsync-probe")
+    with open(path, "ab") as probe:
+        for _ in range(iterations):
+            if rate > 0:
+                time.sleep(1 / rate)
+            start = time.perf_counter()
+            probe.write(b'{"t":"A","id":1}\n')
+            probe.flush()
+            os.fsync(probe.fileno())
+            latencies.append((time.perf_counter() - start) * 1e6)
+    os.remove(path)
+    return sorted(latencies)
+
+
+def measure_journal(directory: str, threads: int, updates: int,
+                    segment_max_bytes: int, rate: float = 0.0) -> None:
+    """
+    Ejecuta appends concurrentes e imprime percentiles por append y throughput.
+    Con rate > 0 los appends llegan a ese ritmo total (updates/s), como en el servidor;
+    con rate = 0 cada hilo encadena appends sin pausa (saturación).
+    """
+    journal = UpdateJournal(directory, segment_max_bytes)
+    per_thread = updates // threads
+    interval = threads / rate if rate > 0 else 0.0
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def worker(offset: float):
+        local = []
+        first = time.perf_counter() + offset
+        for i in range(per_thread):
+            if interval:
+                delay = first + i * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            start = time.perf_counter()
+            entry_id = journal.append(SAMPLE_UPDATE)
+            local.append((time.perf_counter() - start) * 1e6)
+            journal.complete(entry_id)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(index * interval / threads,))
+               for index in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    journal.close()
+    latencies.sort()
+    mode = f"{rate:.0f}/s" if rate > 0 else "saturado"
+    print(f"journal hilos={threads:<3d} {mode:>9s} append p50={percentile(latencies, 0.5):8.1f}us "
+          f"p95={percentile(latencies, 0.95):8.1f}us p99={percentile(latencies, 0.99):8.1f}us "
+          f"max={latencies[-1]:8.1f}us throughput={len(latencies) / elapsed:8.0f} updates/s")
+
+
+def run(thread_counts: List[int], updates: int, segment_max_bytes: int,
+        directory: str = None, rate: float = 500.0) -> None:
+    " Mide el fsync aislado y luego el journal con cada cantidad de hilos "
+    with tempfile.TemporaryDirectory(dir=directory) as workdir:
+        print(f"directorio: {os.path.abspath(workdir)}")
+        for fsync_rate in (rate, 0.0):
+            fsync = measure_fsync(workdir, rate=fsync_rate)
+            mode = f"{fsync_rate:.0f}/s" if fsync_rate > 0 else "saturado"
+            print(f"fsync aislado    {mode:>9s} p50={percentile(fsync, 0.5):8.1f}us "
+                  f"p95={percentile(fsync, 0.95):8.1f}us p99={percentile(fsync, 0.99):8.1f}us")
+        for threads in thread_counts:
+            with tempfile.TemporaryDirectory(dir=workdir) as journal_dir:
+                measure_journal(journal_dir, threads, updates, segment_max_bytes, rate)
+            with tempfile.TemporaryDirectory(dir=workdir) as journal_dir:
+                measure_journal(journal_dir, threads, updates, segment_max_bytes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--segment-max-bytes", type=int, default=4 * 1024 * 1024)
+    parser.add_argument("--rate", type=float, default=500.0,
+                        help="updates/s totales del escenario con llegadas pautadas")
+    parser.add_argument("--dir", default=None,
+                        help="directorio base (en el disco a evaluar) para los archivos")
+    args = parser.parse_args()
+    if args.dir:
+        os.makedirs(args.dir, exist_ok=True)
+    run(args.threads, args.updates, args.segment_max_bytes, args.dir, args.rate)
@@ -0,0 +1,91 @@
+"""
+Path: benchmarks/bench_webhook_rejection.py
+Compara el costo de rechazar tráfico en la vista /webhook (secreto inválido o tipo de
+update no permitido) contra el parseo completo JSON + pydantic. Cada caso crea un
+contexto de request de Flask con el body en el stream de entrada, como en el servidor,
+y llama a la vista real; el costo de crear el contexto es común a todos los casos y se
+informa aparte (solo_contexto).
+
+Referencia (CPython 3.11, body de ~1 KB, mínimo de 5 repeticiones):
+    solo_contexto      ~100us
+    secreto_invalido   ~105us  (no lee el body)
+    tipo_no_permitido  ~150us  (lee el body, mira los primeros bytes y responde JSON)
+    parseo_completo    ~175us  (piso: sin journal, controlador ni Gemini)
+
+Requiere Flask instalado.
+
+Uso:
+    python -m benchmarks.bench_webhook_rejection --iterations 5000
+"""
+
+import argparse
+import json
+import logging
+import timeit
+from flask import Flask, jsonify, request
+from src.models.telegram_update import TelegramUpdate
+from src.utils.update_filter import SECRET_TOKEN_HEADER
+from src.views.app_view import blueprint, webhook
+
+SECRET = "s3cr3t-token_for-bench"
+ALLOWED = frozenset({"message"})
+MESSAGE_BODY = json.dumps({
+    "update_id": 123456789,
+    "message": {
+        "message_id": 42,
+        "from": {"id": 1, "is_bot": False, "first_name": "Alumno"},
+        "chat": {"id": 1, "type": "private", "first_name": "Alumno"},
+        "date": 1700000000,
+        "text": "¿Podés explicarme la ley de Ohm? " * 20,
+    },
+}).encode("utf-8")
+EDITED_BODY = MESSAGE_BODY.replace(b'"message"', b'"edited_message"', 1)
+
+
+def build_app() -> Flask:
+    " Aplicación con la configuración del webhook usada por src.main "
+    app = Flask(__name__)
+    app.config["logger"] = logging.getLogger("bench_webhook_rejection")
+    app.config["webhook_secret_token"] = SECRET
+    app.config["allowed_updates"] = ALLOWED
+    app.register_blueprint(blueprint)
+    return app
+
+
+def post(app: Flask, secret: str, body: bytes, view) -> None:
+    " Simula un POST a /webhook y ejecuta view dentro del contexto de la request "
+    with app.test_request_context("/webhook", method="POST", data=body,
+                                  content_type="application/json",
+                                  headers={SECRET_TOKEN_HEADER: secret}):
+        view()
+
+
+def full_parse():
+    """
+    Piso del camino sin rechazo temprano: JSON y pydantic sobre el body de la request y
+    la respuesta JSON (sin journal, controlador ni Gemini).
+    """
+    TelegramUpdate.parse_update(request.get_json())
+    return jsonify({"status": "ok", "response": None})
+
+
+def run(iterations: int) -> None:
+    " Ejecuta cada caso e imprime el costo medio en microsegundos "
+    app = build_app()
+    cases = {
+        "solo_contexto": lambda: post(app, SECRET, MESSAGE_BODY, lambda: None),
+        "secreto_invalido": lambda: post(app, "otro", MESSAGE_BODY, webhook),
+        "tipo_no_permitido": lambda: post(app, SECRET, EDITED_BODY, webhook),
+        "parseo_completo": lambda: post(app, SECRET, MESSAGE_BODY, full_parse),
+    }
+    for name, case in cases.items():
+        # Mínimo de varias repeticiones: el costo del contexto tiene mucho ruido.
+        elapsed = min(timeit.repeat(case, number=iterations, repeat=5))
+        print(f"{name:20s} {elapsed / iterations * 1e6:8.2f}us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+    run(args.iterations)
@@ -0,0 +1,47 @@
+"""
+Path: src/analytics_cli.py
+Consulta de la analítica de uso desde la línea de comandos.
+
+Uso:
+    python -m src.analytics_cli resumen --dia 2026-10-19 [--curso "Física 3A"]
+    python -m src.analytics_cli chats --dia 2026-10-19 --curso privado [--limite 20]
+"""
+
+import argparse
+import json
+from datetime import date
+from src.utils.logging.simple_logger import LoggerService
+from src.services.database_connection_manager import DatabaseConnectionManager
+from src.services.usage_analytics_repository import UsageAnalyticsRepository
+
+
+def main():
+    " Punto de entrada de la CLI de analítica "
+    parser = argparse.ArgumentParser(description="Analítica de uso de ProfeBOT")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    resumen = subparsers.add_parser("resumen", help="Totales por curso en un día")
+    resumen.add_argument("--dia", default=date.today().isoformat())
+    resumen.add_argument("--curso")
+
+    chats = subparsers.add_parser("chats", help="Chats con más uso de un curso en un día")
+    chats.add_argument("--dia", default=date.today().isoformat())
+    chats.add_argument("--curso", required=True)
+    chats.add_argument("--limite", type=int, default=20)
+
+    args = parser.parse_args()
+    logger = LoggerService()
+    repository = UsageAnalyticsRepository(DatabaseConnectionManager(logger), logger)
+
+    if args.comando == "resumen":
+        if args.curso:
+            result = repository.get_course_day(args.dia, args.curso)
+        else:
+            result = repository.get_courses_for_day(args.dia)
+    else:
+        result = repository.get_top_chats(args.dia, args.curso, args.limite)
+    print(json.dumps(result, ensure_ascii=False, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -29,3 +29,55 @@ class CentralConfig:
     TELEGRAM_TOKEN: str = os.getenv("TELEGRAM_TOKEN")
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY")
     PORT: int = int(os.getenv("PORT", "8000"))
+    # GENERATION_POLICIES: JSON opcional que sobrescribe la tabla de políticas de generación,
+    # por ejemplo {"saludo": {"max_output_tokens": 128}}.
+    GENERATION_POLICIES: str = os.getenv("GENERATION_POLICIES")
+    # JOURNAL_DIR: Directorio del journal de updates aceptados (vacío para deshabilitarlo).
+    JOURNAL_DIR: str = os.getenv("JOURNAL_DIR", "data/journal")
+    # GEMINI_CONTEXT_CACHE: "1" para registrar el prefijo estático en la caché de Gemini.
+    GEMINI_CONTEXT_CACHE: bool = os.getenv("GEMINI_CONTEXT_CACHE", "0") == "1"
+    GEMINI_CONTEXT_CACHE_TTL: int = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600"))
+    # GEMINI_REFERENCE_DOCS_DIR: Directorio opcional con material de referencia (.md/.txt).
+    GEMINI_REFERENCE_DOCS_DIR: str = os.getenv("GEMINI_REFERENCE_DOCS_DIR")
+    JOURNAL_SEGMENT_MAX_BYTES: int = int(os.getenv("JOURNAL_SEGMENT_MAX_BYTES", "4194304"))
+    # MEDIA_MAX_BYTES: Tamaño máximo de adjunto (20 MB es el límite de descarga de la Bot API).
+    MEDIA_MAX_BYTES: int = int(os.getenv("MEDIA_MAX_BYTES", "20971520"))
+    MEDIA_MAX_IMAGE_SIDE: int = int(os.getenv("MEDIA_MAX_IMAGE_SIDE", "1600"))
+    MEDIA_WORKERS: int = int(os.getenv("MEDIA_WORKERS", "2"))
+    # ADMIN_TOKEN: Token requerido en el header X-Admin-Token de los endpoints /admin
+    # (si no está definido, los endpoints de administración quedan deshabilitados).
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN")
+    PROFILING_DIR: str = os.getenv("PROFILING_DIR", "data/profiles")
+    # SLOW_UPDATE_SECONDS: Umbral para registrar updates lentos (0 lo deshabilita).
+    SLOW_UPDATE_SECONDS: float = float(os.getenv("SLOW_UPDATE_SECONDS", "10"))
+    # SYSTEM_INSTRUCTIONS_REFRESH_SECONDS: Cada cuánto se releen las instrucciones del sistema
+    # de la BD para invalidar la caché de contexto si cambiaron (0 lo deshabilita).
+    SYSTEM_INSTRUCTIONS_REFRESH_SECONDS: float = float(
+        os.getenv("SYSTEM_INSTRUCTIONS_REFRESH_SECONDS", "0")
+    )
+    # ANALYTICS_COURSES: JSON opcional que asigna chats a cursos,
+    # por ejemplo {"-1001234567890": "Física 3A"}.
+    ANALYTICS_COURSES: str = os.getenv("ANALYTICS_COURSES")
+    # BROADCAST_RATE: Mensajes por segundo de las difusiones (la Bot API tolera ~30/s).
+    BROADCAST_RATE: float = float(os.getenv("BROADCAST_RATE", "25"))
+    BROADCAST_WORKERS: int = int(os.getenv("BROADCAST_WORKERS", "8"))
+    # EXECUTION_LANES: "1" para procesar los updates en carriles (inmediato, LLM corta,
+    # LLM larga) con pools de hilos independientes. El webhook responde al encolar, por lo
+    # que Telegram no reintenta los fallos: quedan pendientes en el journal hasta el
+    # próximo reinicio. Desactivado por defecto.
+    EXECUTION_LANES: bool = os.getenv("EXECUTION_LANES", "0") == "1"
+    LANE_WORKERS_INSTANT: int = int(os.getenv("LANE_WORKERS_INSTANT", "4"))
+    LANE_WORKERS_SHORT: int = int(os.getenv("LANE_WORKERS_SHORT", "8"))
+    LANE_WORKERS_LONG: int = int(os.getenv("LANE_WORKERS_LONG", "4"))
+    # Parámetros de setWebhook. WEBHOOK_MAX_CONNECTIONS admite de 1 a 100 (Telegram usa 40
+    # por defecto); WEBHOOK_ALLOWED_UPDATES es una lista separada por comas.
+    WEBHOOK_MAX_CONNECTIONS: int = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+    WEBHOOK_ALLOWED_UPDATES: list = [
+        update_type.strip()
+        for update_type in os.getenv("WEBHOOK_ALLOWED_UPDATES", "message").split(",")
+        if update_type.strip()
+    ]
+    WEBHOOK_DROP_PENDING_UPDATES: bool = os.getenv("WEBHOOK_DROP_PENDING_UPDATES", "0") == "1"
+    # WEBHOOK_SECRET_TOKEN: Telegram lo envía en el header X-Telegram-Bot-Api-Secret-Token
+    # (1-256 caracteres A-Z, a-z, 0-9, _ y -).
+    WEBHOOK_SECRET_TOKEN: str = os.getenv("WEBHOOK_SECRET_TOKEN")
@@ -3,53 +3,279 @@ Path: src/controllers/app_controller.py
 Controlador de la aplicación que maneja las solicitudes.
 """
 
-from typing import Optional
+import time
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 from src.models.telegram_update import TelegramUpdate
 from src.services.gemini_service import GeminiService
+from src.services.request_classifier import RequestClassifier, PolicyStats
+from src.services.update_journal import UpdateJournal
+from src.services.media_service import MediaService, MediaTooLargeError, UnsupportedMediaError
 from src.interfaces.messaging_service import IMessagingService
+from src.services.usage_analytics_service import UsageAnalyticsService
+from src.services.known_chats_repository import KnownChatsRepository
+from src.services.execution_lanes import ExecutionLanes, INSTANT, SHORT, LONG
+from src.services.relevance_gate import RelevanceGate
+from src.utils.profiling import UpdateProfiler, stage
+
+MEDIA_REJECTED_MESSAGE = (
+    "No puedo procesar ese archivo: es demasiado grande o de un tipo no soportado."
+)
+
+# Respuestas fijas que no requieren invocar a Gemini.
+COMMAND_REPLIES = {
+    "/start": "¡Hola! Soy ProfeBOT. Escribime tu consulta y te ayudo.",
+    "/help": "Enviame una pregunta, una foto de un ejercicio o un PDF y te respondo.",
+}
 
 class AppController:
     "Controlador de la aplicación que maneja las solicitudes."
     def __init__(self,
                  messaging_service: IMessagingService,
                  gemini_service: GeminiService,
-                 logger=None):
+                 logger=None,
+                 request_classifier: Optional[RequestClassifier] = None,
+                 journal: Optional[UpdateJournal] = None,
+                 media_service: Optional[MediaService] = None,
+                 profiler: Optional[UpdateProfiler] = None,
+                 analytics: Optional[UsageAnalyticsService] = None,
+                 known_chats: Optional[KnownChatsRepository] = None,
+                 lanes: Optional[ExecutionLanes] = None,
+                 relevance_gate: Optional[RelevanceGate] = None):
         self.logger = logger
         self.messaging_service = messaging_service
         self.gemini_service = gemini_service
+        self.request_classifier = request_classifier or RequestClassifier(logger=logger)
+        self.policy_stats = PolicyStats()
+        self.journal = journal
+        self.media_service = media_service
+        self.profiler = profiler
+        self.analytics = analytics
+        self.known_chats = known_chats
+        self.lanes = lanes
+        self.relevance_gate = relevance_gate
+        self._local = threading.local()
+        # Entradas del journal en proceso: evita procesar dos veces la misma entrada
+        # (reenvío de Telegram mientras se reprocesa o mientras sigue en un carril).
+        self._in_flight = set()
+        self._in_flight_lock = threading.Lock()
+        # Turnos respondidos por Gemini en cada chat (profundidad de historial por chat).
+        self._chat_turns: Dict[Any, int] = {}
+        self._chat_turns_lock = threading.Lock()
+
+    def submit_update(self, update: dict) -> str:
+        """
+        Registra el update en el journal y lo encola en el carril que corresponda.
+        Retorna el nombre del carril. Sin carriles configurados, procesa en el hilo actual.
+        """
+        journal_id = self.journal.append(update) if self.journal else None
+        if not self.lanes:
+            self.process_update(update, journal_id=journal_id)
+            return INSTANT
+        lane, policy_name = self._classify(update)
+        self.lanes.submit(lane, self.process_update, update,
+                          journal_id=journal_id, policy_name=policy_name)
+        return lane
+
+    def _classify(self, update: dict) -> Tuple[str, Optional[str]]:
+        """
+        Retorna (carril, política de generación) del update. Corre en el hilo del webhook,
+        por lo que no hace E/S: el filtro de relevancia usa solo la identidad cacheada.
+        """
+        telegram_update = TelegramUpdate.parse_update(update)
+        if not telegram_update:
+            return INSTANT, None
+        if self.relevance_gate and not self.relevance_gate.addressed_if_known(
+                telegram_update.message):
+            return INSTANT, None
+        if self.canned_response(telegram_update) is not None:
+            return INSTANT, None
+        text = telegram_update.get_response()
+        has_media = bool(self.media_service and telegram_update.get_media())
+        if not text and not has_media:
+            return INSTANT, None
+        policy_name = self.request_classifier.classify(
+            text or "", self.history_depth(self._chat_id(telegram_update))
+        )
+        if has_media or policy_name == "explicacion":
+            return LONG, policy_name
+        return SHORT, policy_name
+
+    def canned_response(self, telegram_update: TelegramUpdate) -> Optional[str]:
+        "Retorna la respuesta fija del mensaje de prueba o de un comando conocido, si aplica."
+        if telegram_update.is_test_message():
+            return telegram_update.get_response()
+        return COMMAND_REPLIES.get(telegram_update.get_command())
+
+    def process_update(self,
+                       update: dict,
+                       journal_id: Optional[int] = None,
+                       policy_name: Optional[str] = None) -> Optional[str]:
+        """
+        Procesa un update de Telegram y genera una respuesta.
+        Si hay journal, el update se registra antes de procesarse (salvo que ya provenga
+        del journal mediante journal_id) y se marca como finalizado solo cuando la
+        respuesta se envió o el update no requería respuesta. Si la generación o el envío
+        fallan, la entrada queda pendiente para reintentarse (ver last_update_handled).
+        policy_name es la política ya elegida al encolar; si falta, se clasifica aquí.
+        """
+        if self.journal and journal_id is None:
+            journal_id = self.journal.append(update)
+        self._local.handled = False
+        if journal_id is not None and not self._claim(journal_id):
+            self.logger.info("[AppController] Update %d ya en proceso o finalizado; se omite",
+                             journal_id)
+            self._local.handled = True
+            return None
+        try:
+            profiler = self.profiler
+            if profiler is not None and profiler.enabled:
+                with profiler.trace(update):
+                    return self._process_update(update, policy_name)
+            return self._process_update(update, policy_name)
+        finally:
+            if self.journal and journal_id is not None:
+                if self._local.handled:
+                    self.journal.complete(journal_id)
+                else:
+                    self.logger.warning(
+                        "[AppController] Update %d sin respuesta enviada; queda pendiente "
+                        "en el journal para reintentarse", journal_id
+                    )
+            if journal_id is not None:
+                with self._in_flight_lock:
+                    self._in_flight.discard(journal_id)
+
+    def _claim(self, journal_id: int) -> bool:
+        "Reserva la entrada del journal para este hilo; False si ya está en proceso o finalizada."
+        with self._in_flight_lock:
+            if journal_id in self._in_flight or not self.journal.is_pending(journal_id):
+                return False
+            self._in_flight.add(journal_id)
+            return True
+
+    def last_update_handled(self) -> bool:
+        """
+        Indica si el último update procesado en este hilo quedó resuelto (respuesta
+        enviada o sin respuesta necesaria). False significa que conviene reintentarlo.
+        """
+        return getattr(self._local, "handled", False)
+
+    def _register_chat(self, telegram_update: TelegramUpdate) -> None:
+        "Registra el chat como conocido para las difusiones; un fallo no corta el update."
+        if not self.known_chats:
+            return
+        try:
+            self.known_chats.register(telegram_update.message["chat"])
+        except Exception as e:  # pylint: disable=broad-except
+            self.logger.warning("[AppController] No se pudo registrar el chat: %s", e)
+
+    def _record_usage(self, telegram_update: TelegramUpdate, start: float) -> None:
+        "Registra el update en la analítica de uso (mensajes, tokens y latencia)."
+        if self.analytics:
+            self.analytics.record(
+                telegram_update.message["chat"], time.perf_counter() - start, self._local.tokens
+            )
+
+    def replay_journal(self) -> int:
+        """
+        Reprocesa los updates que quedaron sin finalizar antes del arranque. Los aceptados
+        después (o reenviados por Telegram y ya en proceso) no se reprocesan.
+        """
+        if not self.journal:
+            return 0
+        entries = self.journal.recovered_entries()
+        for entry_id, update in entries:
+            self.logger.info("[AppController] Reprocesando update del journal: %d", entry_id)
+            try:
+                self.process_update(update, journal_id=entry_id)
+            except Exception as e:  # pylint: disable=broad-except
+                # La entrada sigue pendiente; se reintenta en el próximo arranque.
+                self.logger.exception(
+                    "[AppController] Error reprocesando el update %d: %s", entry_id, e
+                )
+        return len(entries)
 
-    def process_update(self, update: dict) -> Optional[str]:
-        "Procesa un update de Telegram y genera una respuesta"
+    def _process_update(self, update: dict, policy_name: Optional[str] = None) -> Optional[str]:
+        start = time.perf_counter()
+        self._local.tokens = 0
         try:
             self.logger.info("[AppController] Procesando update")
-            telegram_update = TelegramUpdate.parse_update(update, self.logger)
+            with stage("parse"):
+                telegram_update = TelegramUpdate.parse_update(update, self.logger)
             self.logger.debug("[AppController] Update parseado: %s", telegram_update)
             if not telegram_update:
                 self.logger.error("[AppController] No se pudo parsear el update")
+                # Reintentar no cambiaría el resultado.
+                self._local.handled = True
+                return None
+            self._register_chat(telegram_update)
+            if self.relevance_gate and not self.relevance_gate.is_addressed(
+                    telegram_update.message, llm_bound=self._llm_bound(telegram_update)):
+                self.logger.debug("[AppController] Mensaje de grupo no dirigido al bot; se omite")
+                self._local.handled = True
                 return None
 
-            response = self.generate_response(telegram_update)
+            response = self.generate_response(telegram_update, policy_name)
             if response:
                 self.logger.info("[AppController] Respuesta generada")
-                self.send_message(telegram_update, response)
+                with stage("telegram.send"):
+                    self._local.handled = self.send_message(telegram_update, response)
+                self._record_usage(telegram_update, start)
                 return response
 
+            if self.needs_reply(telegram_update):
+                self.logger.error("[AppController] No se pudo generar la respuesta del update")
+                return None
             self.logger.info("[AppController] Update recibido sin respuesta generada")
+            self._local.handled = True
+            self._record_usage(telegram_update, start)
             return None
         except (ValueError, KeyError) as e:
             self.logger.exception("[AppController] Excepción en process_update: %s", e)
             self.logger.error("[AppController] Error inesperado al procesar el update")
+            self._local.handled = True
             return None
 
-    def generate_response(self, telegram_update: TelegramUpdate) -> Optional[str]:
+    def needs_reply(self, telegram_update: TelegramUpdate) -> bool:
+        "Indica si el update espera una respuesta: comando o prueba, texto, caption o adjunto."
+        if self.canned_response(telegram_update) is not None:
+            return True
+        return self._llm_bound(telegram_update)
+
+    def _llm_bound(self, telegram_update: TelegramUpdate) -> bool:
+        "Indica si el update iría a Gemini: texto, caption o adjunto sin respuesta fija."
+        if self.canned_response(telegram_update) is not None:
+            return False
+        if telegram_update.get_response():
+            return True
+        return bool(self.media_service and telegram_update.get_media())
+
+    def generate_response(self,
+                          telegram_update: TelegramUpdate,
+                          policy_name: Optional[str] = None) -> Optional[str]:
         "Genera una respuesta para un objeto TelegramUpdate utilizando el servicio Gemini."
+        canned = self.canned_response(telegram_update)
+        if canned is not None:
+            return canned
         original_text = telegram_update.get_response()
-        if original_text:
-            if original_text.lower() == 'test':
-                return original_text
+        media = None
+        if self.media_service:
+            media = telegram_update.get_media(
+                self.media_service.max_bytes, self.media_service.max_image_side
+            )
+        if original_text or media:
             try:
-                response = self.gemini_service.send_message(original_text)
-                return response
+                if media:
+                    return self._send_with_policy(
+                        original_text or "", self._build_media_content(media, original_text),
+                        policy_name, self._chat_id(telegram_update)
+                    )
+                return self._send_with_policy(original_text, policy_name=policy_name,
+                                              chat_id=self._chat_id(telegram_update))
+            except (MediaTooLargeError, UnsupportedMediaError) as e:
+                self.logger.warning("[AppController] Adjunto rechazado: %s", e)
+                return MEDIA_REJECTED_MESSAGE
             except (ConnectionError, TimeoutError) as e:
                 self.logger.error(
                     "[AppController] Error de conexión generando respuesta de Gemini: %s", e
@@ -68,26 +294,80 @@ class AppController:
                 return None
         return None
 
-    def send_message(self, telegram_update: TelegramUpdate, text: str) -> None:
-        "Envía un mensaje a un chat de Telegram usando la instancia inyectada de TelegramService"
+    def _build_media_content(self, media: dict, text: Optional[str]) -> List[Any]:
+        "Construye la entrada multimodal: el adjunto procesado seguido del texto, si lo hay."
+        with stage("media"):
+            content: List[Any] = [self.media_service.build_part(media)]
+        if text:
+            content.append(text)
+        return content
+
+    def _send_with_policy(self,
+                          text: str,
+                          content: Optional[List[Any]] = None,
+                          policy_name: Optional[str] = None,
+                          chat_id: Any = None) -> str:
+        """
+        Envía el texto (o el contenido multimodal, si se indica) a Gemini con la política
+        indicada o, si no se indica, la elegida por el clasificador, y registra métricas.
+        """
+        if policy_name is None:
+            policy_name = self.request_classifier.classify(text, self.history_depth(chat_id))
+        model_name, generation_config = self.request_classifier.get_policy(policy_name)
+        self.logger.debug("[AppController] Política '%s' seleccionada (modelo %s)",
+                          policy_name, model_name)
+        start = time.perf_counter()
+        response = self.gemini_service.send_message(
+            content or text, model_name=model_name, generation_config=generation_config
+        )
+        self._local.tokens = self.gemini_service.last_token_count
+        if chat_id is not None:
+            with self._chat_turns_lock:
+                self._chat_turns[chat_id] = self._chat_turns.get(chat_id, 0) + 1
+        self.policy_stats.record(policy_name, time.perf_counter() - start, self._local.tokens)
+        averages = self.policy_stats.averages(policy_name)
+        self.logger.info(
+            "[AppController] Política '%s': latencia media %.2fs, tokens medios %.1f (n=%d)",
+            policy_name, averages["latency"], averages["tokens"], averages["count"]
+        )
+        return response
+
+    def history_depth(self, chat_id: Any) -> int:
+        "Cantidad de turnos que Gemini ya respondió en el chat indicado."
+        with self._chat_turns_lock:
+            return self._chat_turns.get(chat_id, 0)
+
+    @staticmethod
+    def _chat_id(telegram_update: TelegramUpdate) -> Any:
+        "Id del chat del update, o None si no está disponible."
+        return (telegram_update.message or {}).get("chat", {}).get("id")
+
+    def send_message(self, telegram_update: TelegramUpdate, text: str) -> bool:
+        """
+        Envía un mensaje a un chat de Telegram usando la instancia inyectada de TelegramService.
+        Retorna False si el envío falló por un error transitorio (red, 429 o 5xx) y conviene
+        reintentar; los rechazos definitivos (p. ej. 403, bot bloqueado) retornan True.
+        """
         self.logger.debug("Iniciando envío de mensaje al chat_id: %s con texto de longitud: %d",
                           telegram_update.message["chat"]["id"], len(text))
         if not (telegram_update.message and
                 "chat" in telegram_update.message and 
                 "id" in telegram_update.message["chat"]):
             self.logger.error("[AppController] chat_id no encontrado en el update")
-            return
+            return True
 
-        success, error_msg = self.messaging_service.send_message(
+        result = self.messaging_service.send_message_detailed(
             telegram_update.message["chat"]["id"], text
         )
-        if success:
+        if result["ok"]:
             chat_id = telegram_update.message["chat"]["id"]
             self.logger.info(
                 "[AppController] Mensaje enviado correctamente al chat_id: %s", chat_id
             )
-        else:
-            self.logger.error(
-                "[AppController] Error enviando mensaje al chat_id %s, text length %d: %s",
-                telegram_update.message["chat"]["id"], len(text), error_msg
-            )
+            return True
+        self.logger.error(
+            "[AppController] Error enviando mensaje al chat_id %s, text length %d: %s",
+            telegram_update.message["chat"]["id"], len(text), result["error"]
+        )
+        status_code = result.get("status_code")
+        return bool(status_code and 400 <= status_code < 500 and status_code != 429)
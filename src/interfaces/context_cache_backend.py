@@ -0,0 +1,34 @@
+"""
+Path: src/interfaces/context_cache_backend.py
+"""
+
+__all__ = ["IContextCacheBackend"]
+
+from abc import ABC, abstractmethod
+from typing import Any, List
+
+class IContextCacheBackend(ABC):
+    "Interfaz para un backend que almacena el prefijo estático del prompt en caché"
+    @abstractmethod
+    def create(self,
+               model_name: str,
+               system_instruction: str,
+               documents: List[str],
+               ttl_seconds: int) -> str:
+        "Registra el prefijo (instrucciones y documentos) y retorna su handle"
+        raise NotImplementedError
+
+    @abstractmethod
+    def refresh(self, handle: str, ttl_seconds: int) -> None:
+        "Extiende la vigencia del prefijo registrado"
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, handle: str) -> None:
+        "Elimina el prefijo registrado"
+        raise NotImplementedError
+
+    @abstractmethod
+    def build_model(self, handle: str, model_name: str) -> Any:
+        "Construye un modelo que referencia el prefijo registrado por su handle"
+        raise NotImplementedError
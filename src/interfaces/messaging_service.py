@@ -5,7 +5,7 @@ Path: src/interfaces/messaging_service.py
 __all__ = ["IMessagingService"]
 
 from abc import ABC, abstractmethod
-from typing import Tuple, Optional
+from typing import Any, Dict, Tuple, Optional
 
 class IMessagingService(ABC):
     "Interfaz para un servicio de mensajería"
@@ -13,3 +13,11 @@ class IMessagingService(ABC):
     def send_message(self, chat_id: int, text: str) -> Tuple[bool, Optional[str]]:
         "Envía un mensaje a un chat de Telegram"
         raise NotImplementedError
+
+    def send_message_detailed(self, chat_id: int, text: str) -> Dict[str, Any]:
+        """
+        Envía un mensaje y retorna un dict con ok, status_code, error y retry_after.
+        La implementación por defecto no informa código de estado ni retry_after.
+        """
+        success, error_msg = self.send_message(chat_id, text)
+        return {"ok": success, "status_code": None, "error": error_msg, "retry_after": None}
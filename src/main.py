@@ -3,6 +3,7 @@ Path: src/main.py
 """
 
 import threading
+import time
 from flask import Flask
 from src.services.webhook_config_service import WebhookConfigService
 from src.configuration.central_config import CentralConfig
@@ -11,12 +12,30 @@ from src.controllers.app_controller import AppController
 from src.views.app_view import blueprint
 from src.services.database_connection_manager import DatabaseConnectionManager
 from src.services.config_repository import ConfigRepository
-from src.services.gemini_service import GeminiService
+from src.services.gemini_service import GeminiService, BASE_GENERATION_CONFIG
+from src.services.context_cache import (
+    ContextCacheManager, GeminiContextCacheBackend, load_reference_documents
+)
 from src.services.telegram_messaging_service import TelegramMessagingService
+from src.services.request_classifier import RequestClassifier
+from src.services.update_journal import UpdateJournal
+from src.services.media_service import MediaService
+from src.services.telegram_service import TelegramService
+from src.utils.profiling import UpdateProfiler
+from src.services.usage_analytics_repository import UsageAnalyticsRepository
+from src.services.usage_analytics_service import UsageAnalyticsService
+from src.services.known_chats_repository import KnownChatsRepository
+from src.services.broadcast_repository import BroadcastRepository
+from src.services.broadcast_service import BroadcastService
+from src.services.execution_lanes import ExecutionLanes, INSTANT, SHORT, LONG
+from src.services.relevance_gate import RelevanceGate
 
 class Application:
     "Clase principal de la aplicación"
-    def __init__(self, logger=None, controller=None, config_service=None):
+    def __init__(self, logger=None, controller=None, config_service=None,
+                 broadcast_service=None, config_repository=None):
+        self.broadcast_service = broadcast_service
+        self.config_repository = config_repository
         if not (logger and controller and config_service):
             logger, controller, config_service = self.create_dependencies()
         self.logger = logger
@@ -35,10 +54,73 @@ class Application:
         connection_manager.create_database_if_not_exists()
         repo = ConfigRepository(connection_manager, logger)
         repo.initialize_configuration()
+        self.config_repository = repo
         system_instructions = repo.get_system_instructions()
 
-        gemini_service = GeminiService(CentralConfig.GEMINI_API_KEY, system_instructions, logger)
-        controller_instance = AppController(telegram_messaging_service, gemini_service, logger)
+        context_cache = None
+        if CentralConfig.GEMINI_CONTEXT_CACHE:
+            context_cache = ContextCacheManager(
+                GeminiContextCacheBackend(BASE_GENERATION_CONFIG),
+                ttl_seconds=CentralConfig.GEMINI_CONTEXT_CACHE_TTL,
+                logger=logger
+            )
+            context_cache.set_context(
+                system_instructions,
+                load_reference_documents(CentralConfig.GEMINI_REFERENCE_DOCS_DIR)
+            )
+        gemini_service = GeminiService(
+            CentralConfig.GEMINI_API_KEY, system_instructions, logger, context_cache
+        )
+        request_classifier = RequestClassifier(
+            RequestClassifier.load_policies(CentralConfig.GENERATION_POLICIES), logger=logger
+        )
+        journal = None
+        if CentralConfig.JOURNAL_DIR:
+            journal = UpdateJournal(
+                CentralConfig.JOURNAL_DIR, CentralConfig.JOURNAL_SEGMENT_MAX_BYTES, logger
+            )
+        telegram_service = TelegramService()
+        media_service = MediaService(
+            telegram_service,
+            logger,
+            max_bytes=CentralConfig.MEDIA_MAX_BYTES,
+            max_image_side=CentralConfig.MEDIA_MAX_IMAGE_SIDE,
+            workers=CentralConfig.MEDIA_WORKERS
+        )
+        analytics_repository = UsageAnalyticsRepository(connection_manager, logger)
+        analytics_repository.initialize_tables()
+        analytics = UsageAnalyticsService(
+            analytics_repository,
+            logger,
+            courses=UsageAnalyticsService.load_courses(CentralConfig.ANALYTICS_COURSES)
+        )
+        known_chats = KnownChatsRepository(connection_manager, logger)
+        known_chats.initialize_table()
+        broadcast_repository = BroadcastRepository(connection_manager, logger)
+        broadcast_repository.initialize_tables()
+        self.broadcast_service = BroadcastService(
+            telegram_messaging_service,
+            broadcast_repository,
+            known_chats,
+            logger,
+            rate_per_second=CentralConfig.BROADCAST_RATE,
+            workers=CentralConfig.BROADCAST_WORKERS
+        )
+        profiler = UpdateProfiler(
+            CentralConfig.PROFILING_DIR, CentralConfig.SLOW_UPDATE_SECONDS, logger=logger
+        )
+        lanes = None
+        if CentralConfig.EXECUTION_LANES:
+            lanes = ExecutionLanes({
+                INSTANT: CentralConfig.LANE_WORKERS_INSTANT,
+                SHORT: CentralConfig.LANE_WORKERS_SHORT,
+                LONG: CentralConfig.LANE_WORKERS_LONG,
+            }, logger)
+        controller_instance = AppController(
+            telegram_messaging_service, gemini_service, logger, request_classifier, journal,
+            media_service, profiler, analytics, known_chats, lanes,
+            RelevanceGate(telegram_service, logger)
+        )
         config_service = WebhookConfigService(telegram_messaging_service, logger)
         # Auditoría de dependencias: se registran las dependencias creadas
         logger.debug("[Application] Dependencias creadas: Logger, Controller, ConfigService")
@@ -49,15 +131,53 @@ class Application:
         app = Flask(__name__)
         app.config["controller"] = controller
         app.config["logger"] = self.logger
+        app.config["admin_token"] = CentralConfig.ADMIN_TOKEN
+        app.config["broadcast_service"] = self.broadcast_service
+        app.config["config_repository"] = self.config_repository
+        app.config["webhook_secret_token"] = CentralConfig.WEBHOOK_SECRET_TOKEN
+        app.config["allowed_updates"] = frozenset(CentralConfig.WEBHOOK_ALLOWED_UPDATES)
         app.register_blueprint(blueprint)
         return app
 
+    def refresh_system_instructions_loop(self):
+        " Relee periódicamente las instrucciones del sistema y actualiza GeminiService "
+        while True:
+            time.sleep(CentralConfig.SYSTEM_INSTRUCTIONS_REFRESH_SECONDS)
+            try:
+                self.controller.gemini_service.update_system_instruction(
+                    self.config_repository.get_system_instructions()
+                )
+            except Exception as e:  # pylint: disable=broad-except
+                self.logger.warning(
+                    "[Application] No se pudieron releer las instrucciones del sistema: %s", e
+                )
+
     def run(self):
         " Inicia la aplicación "
         threading.Thread(target=self.config_service.run_configuration, daemon=True).start()
+        if self.controller.relevance_gate:
+            # Se precalcula la identidad del bot (getMe) antes del primer mensaje de grupo.
+            threading.Thread(target=self.controller.relevance_gate.identity, daemon=True).start()
+        threading.Thread(target=self.controller.replay_journal, daemon=True).start()
+        if self.config_repository and CentralConfig.SYSTEM_INSTRUCTIONS_REFRESH_SECONDS > 0:
+            threading.Thread(target=self.refresh_system_instructions_loop, daemon=True).start()
+        if self.controller.analytics:
+            self.controller.analytics.start()
+        if self.broadcast_service:
+            threading.Thread(target=self.broadcast_service.resume_unfinished, daemon=True).start()
         try:
             self.app.run(host="0.0.0.0", port=self.port, debug=True, use_reloader=False)
         except (OSError, RuntimeError) as e:
             self.logger.exception("[Application] Exception occurred: %s", e)
         finally:
+            # Se drenan los carriles antes de cerrar el journal para que cada update
+            # en curso pueda registrar su finalización.
+            if self.controller.lanes:
+                self.controller.lanes.shutdown()
+            if self.controller.analytics:
+                self.controller.analytics.stop()
+            if self.controller.media_service:
+                self.controller.media_service.shutdown()
+            if self.controller.journal:
+                self.controller.journal.close()
             self.logger.info("[Application] El servidor se ha detenido")
@@ -25,15 +25,73 @@ class TelegramUpdate(BaseModel):
         """
         Procesa el mensaje recibido.
         Si es 'test' retorna el mensaje de prueba;
-        de lo contrario, solo retorna el texto para que el controlador invoque al servicio Gemini.
+        de lo contrario, solo retorna el texto (o el caption de un adjunto) para que el
+        controlador invoque al servicio Gemini.
         """
         if self.message:
-            text = self.message.get('text')
+            text = self.message.get('text') or self.message.get('caption')
+            if not text:
+                return None
             if text.lower() == 'test':
                 return "¡Hola! ¿Cómo puedo ayudarte? <modo test>."
             return text
         return None
 
+    def is_test_message(self) -> bool:
+        "Indica si el mensaje es el mensaje de prueba 'test'."
+        text = (self.message or {}).get('text')
+        return bool(text) and text.strip().lower() == 'test'
+
+    def get_command(self) -> Optional[str]:
+        "Retorna el comando del mensaje (por ejemplo '/start', sin '@bot'), o None."
+        text = (self.message or {}).get('text') or ''
+        if not text.startswith('/'):
+            return None
+        return text.split(maxsplit=1)[0].split('@', 1)[0].lower()
+
+    def get_media(self,
+                  max_photo_bytes: Optional[int] = None,
+                  target_side: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Retorna la descripción del adjunto del mensaje (foto, documento, nota de voz o audio)
+        con las claves kind, file_id, file_unique_id, file_size y mime_type; None si no hay.
+        Para fotos elige, entre los tamaños que no superan max_photo_bytes, el más chico
+        cuyo lado mayor alcanza target_side, o el más grande si ninguno lo alcanza.
+        """
+        if not self.message:
+            return None
+        photos = self.message.get('photo')
+        if photos:
+            candidates = [p for p in photos
+                          if not max_photo_bytes or p.get('file_size', 0) <= max_photo_bytes]
+            candidates = candidates or photos[:1]
+            photo = candidates[-1]
+            if target_side:
+                large_enough = [
+                    p for p in candidates
+                    if max(p.get('width', 0), p.get('height', 0)) >= target_side
+                ]
+                if large_enough:
+                    photo = min(large_enough, key=lambda p: max(p['width'], p['height']))
+            return {
+                "kind": "photo",
+                "file_id": photo["file_id"],
+                "file_unique_id": photo.get("file_unique_id", photo["file_id"]),
+                "file_size": photo.get("file_size"),
+                "mime_type": "image/jpeg",
+            }
+        for kind in ('document', 'voice', 'audio'):
+            attachment = self.message.get(kind)
+            if attachment:
+                return {
+                    "kind": kind,
+                    "file_id": attachment["file_id"],
+                    "file_unique_id": attachment.get("file_unique_id", attachment["file_id"]),
+                    "file_size": attachment.get("file_size"),
+                    "mime_type": attachment.get("mime_type"),
+                }
+        return None
+
     @staticmethod
     def parse_update(update: Dict[str, Any], logger=None) -> Optional["TelegramUpdate"]:
         "Parsea un objeto de actualización de Telegram con validación adicional"
@@ -0,0 +1,155 @@
+"""
+Path: src/services/broadcast_repository.py
+Repositorio de difusiones y del progreso por destinatario.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+from src.services.database_connection_manager import DatabaseConnectionManager
+
+# Estados de un destinatario. 'sending' se persiste antes de enviar: si el proceso
+# se interrumpe, esos destinatarios no se reenvían al reanudar (sin duplicados) y
+# pasan a 'unknown', ya que no se sabe si el mensaje llegó.
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+BLOCKED = "blocked"
+UNKNOWN = "unknown"
+
+
+class BroadcastRepository:
+    " Repositorio para las tablas broadcasts y broadcast_recipients "
+    def __init__(self, connection_manager: DatabaseConnectionManager, logger=None):
+        self.connection_manager = connection_manager
+        self.logger = logger
+
+    def initialize_tables(self):
+        " Crea las tablas de difusión si no existen "
+        with self.connection_manager.get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS broadcasts (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        text TEXT NOT NULL,
+                        status VARCHAR(16) NOT NULL DEFAULT 'running',
+                        total INT NOT NULL DEFAULT 0,
+                        created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                        finished_at DATETIME NULL
+                    );
+                """)
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS broadcast_recipients (
+                        broadcast_id INT NOT NULL,
+                        chat_id BIGINT NOT NULL,
+                        status VARCHAR(16) NOT NULL DEFAULT 'pending',
+                        error VARCHAR(255) NULL,
+                        updated_at DATETIME NULL,
+                        PRIMARY KEY (broadcast_id, chat_id),
+                        INDEX idx_broadcast_status (broadcast_id, status)
+                    );
+                """)
+                connection.commit()
+                self.logger.debug("Tablas de difusión verificadas/creadas.")
+
+    def create_broadcast(self, text: str, chat_ids: List[int]) -> int:
+        " Crea la difusión con todos sus destinatarios en estado pendiente "
+        with self.connection_manager.get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "INSERT INTO broadcasts (text, total) VALUES (%s, %s);",
+                    (text, len(chat_ids))
+                )
+                broadcast_id = cursor.lastrowid
+                cursor.executemany(
+                    "INSERT INTO broadcast_recipients (broadcast_id, chat_id) VALUES (%s, %s);",
+                    [(broadcast_id, chat_id) for chat_id in chat_ids]
+                )
+                connection.commit()
+        return broadcast_id
+
+    def get_broadcast(self, broadcast_id: int) -> Optional[Dict[str, Any]]:
+        " Retorna la difusión con el conteo de destinatarios por estado "
+        with self.connection_manager.get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT text, status, total FROM broadcasts WHERE id = %s;", (broadcast_id,)
+                )
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                cursor.execute(
+                    "SELECT status, COUNT(*) FROM broadcast_recipients "
+                    "WHERE broadcast_id = %s GROUP BY status;",
+                    (broadcast_id,)
+                )
+                counts = dict(cursor.fetchall())
+        return {"id": broadcast_id, "text": row[0], "status": row[1], "total": row[2],
+                "recipients": counts}
+
+    def unfinished_broadcasts(self) -> List[int]:
+        " Retorna los ids de difusiones que no llegaron a finalizar "
+        with self.connection_manager.get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT id FROM broadcasts WHERE status = 'running' ORDER BY id;")
+                return [row[0] for row in cursor.fetchall()]
+
+    def claim_pending(self, broadcast_id: int, limit: int) -> List[int]:
+        " Toma hasta limit destinatarios pendientes y los marca como 'sending' "
+        with self.connection_manager.get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT chat_id FROM broadcast_recipients "
+                    "WHERE broadcast_id = %s AND status = %s ORDER BY chat_id LIMIT %s "
+                    "FOR UPDATE;",
+                    (broadcast_id, PENDING, limit)
+                )
+                chat_ids = [row[0] for row in cursor.fetchall()]
+                if chat_ids:
+                    cursor.execute(
+                        "UPDATE broadcast_recipients SET status = %s, updated_at = NOW() "
+                        "WHERE broadcast_id = %s AND chat_id IN "
+                        f"({', '.join(['%s'] * len(chat_ids))});",
+                        [SENDING, broadcast_id, *chat_ids]
+                    )
+                connection.commit()
+        return chat_ids
+
+    def mark_interrupted(self, broadcast_id: int) -> int:
+        """
+        Pasa a 'unknown' los destinatarios que quedaron en 'sending' por una interrupción.
+        Retorna cuántos se marcaron.
+        """
+        with self.connection_manager.get_connection() as connection:
+            with connection.cursor() as cursor:
+                updated = cursor.execute(
+                    "UPDATE broadcast_recipients SET status = %s, updated_at = NOW() "
+                    "WHERE broadcast_id = %s AND status = %s;",
+                    (UNKNOWN, broadcast_id, SENDING)
+                )
+                connection.commit()
+        return updated
+
+    def save_results(self, broadcast_id: int, results: List[Tuple[int, str, Optional[str]]]):
+        " Persiste el resultado (chat_id, estado, error) de un lote de envíos "
+        if not results:
+            return
+        with self.connection_manager.get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    "UPDATE broadcast_recipients SET status = %s, error = %s, updated_at = NOW() "
+                    "WHERE broadcast_id = %s AND chat_id = %s;",
+                    [(status, (error or "")[:255] or None, broadcast_id, chat_id)
+                     for chat_id, status, error in results]
+                )
+                connection.commit()
+
+    def finish_broadcast(self, broadcast_id: int) -> None:
+        " Marca la difusión como finalizada "
+        with self.connection_manager.get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE broadcasts SET status = 'finished', finished_at = NOW() "
+                    "WHERE id = %s;",
+                    (broadcast_id,)
+                )
+                connection.commit()
@@ -0,0 +1,178 @@
+"""
+Path: src/services/broadcast_service.py
+Difusión masiva de anuncios a los chats conocidos.
+------------------------------------------------------------------------------
+- La audiencia se resuelve con KnownChatsRepository.find_audience y cada
+  destinatario se persiste como 'pending'.
+- Los destinatarios se toman por lotes del tamaño del pool de hilos (marcados
+  como 'sending' antes de enviar) y se envían limitados por un token bucket a la
+  tasa sostenible de la Bot API (~30 mensajes/s). Los resultados se guardan al
+  terminar cada lote, por lo que una interrupción afecta a lo sumo un lote.
+- Al reanudar una difusión interrumpida solo se envían los 'pending', por lo
+  que ningún chat recibe el anuncio dos veces. Los que quedaron en 'sending'
+  se informan como 'unknown'.
+- Los chats que responden 403 (bot bloqueado) se marcan como bloqueados.
+- Durante el envío se informan tasa de entrega y tiempo restante estimado.
+------------------------------------------------------------------------------
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from src.interfaces.messaging_service import IMessagingService
+from src.services.broadcast_repository import (
+    BroadcastRepository, SENDING, SENT, FAILED, BLOCKED, UNKNOWN
+)
+from src.services.known_chats_repository import KnownChatsRepository
+from src.utils.rate_limiter import TokenBucket
+
+
+class BroadcastService:
+    " Orquesta el envío concurrente y reanudable de difusiones "
+    def __init__(self,
+                 messaging_service: IMessagingService,
+                 broadcast_repository: BroadcastRepository,
+                 known_chats: KnownChatsRepository,
+                 logger=None,
+                 rate_per_second: float = 25.0,
+                 workers: int = 8,
+                 batch_size: Optional[int] = None,
+                 max_retries: int = 3,
+                 progress_interval: float = 5.0):
+        self.messaging_service = messaging_service
+        self.repository = broadcast_repository
+        self.known_chats = known_chats
+        self.logger = logger
+        self.limiter = TokenBucket(rate_per_second, burst=max(1, int(rate_per_second)))
+        self.workers = workers
+        # Lotes chicos: los resultados se persisten poco después de cada envío.
+        self.batch_size = batch_size or workers
+        self.max_retries = max_retries
+        self.progress_interval = progress_interval
+        self._running: Dict[int, threading.Thread] = {}
+        self._progress: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def start_broadcast(self, text: str, audience: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Crea una difusión para la audiencia indicada y la ejecuta en segundo plano.
+        audience admite chat_types (lista de tipos de chat) y active_since_days.
+        """
+        audience = audience or {}
+        chat_ids = self.known_chats.find_audience(
+            audience.get("chat_types"), audience.get("active_since_days")
+        )
+        broadcast_id = self.repository.create_broadcast(text, chat_ids)
+        self.logger.info("[Broadcast] Difusión %d creada para %d chats",
+                         broadcast_id, len(chat_ids))
+        self._start_thread(broadcast_id)
+        return broadcast_id
+
+    def resume_unfinished(self) -> List[int]:
+        " Reanuda las difusiones que quedaron sin finalizar "
+        broadcast_ids = self.repository.unfinished_broadcasts()
+        for broadcast_id in broadcast_ids:
+            self.logger.info("[Broadcast] Reanudando difusión %d", broadcast_id)
+            self._start_thread(broadcast_id)
+        return broadcast_ids
+
+    def get_status(self, broadcast_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Retorna el estado persistido de la difusión y el progreso en curso. 'unknown'
+        cuenta los destinatarios cuyo envío se interrumpió sin conocer el resultado.
+        """
+        status = self.repository.get_broadcast(broadcast_id)
+        if status is not None:
+            with self._lock:
+                status["progress"] = dict(self._progress.get(broadcast_id, {}))
+                thread = self._running.get(broadcast_id)
+            recipients = status["recipients"]
+            in_flight = recipients.get(SENDING, 0) if thread and thread.is_alive() else 0
+            status["unknown"] = (
+                recipients.get(UNKNOWN, 0) + recipients.get(SENDING, 0) - in_flight
+            )
+        return status
+
+    def _start_thread(self, broadcast_id: int) -> None:
+        with self._lock:
+            if broadcast_id in self._running and self._running[broadcast_id].is_alive():
+                return
+            thread = threading.Thread(target=self.run, args=(broadcast_id,), daemon=True)
+            self._running[broadcast_id] = thread
+        thread.start()
+
+    def run(self, broadcast_id: int) -> None:
+        " Envía todos los destinatarios pendientes de la difusión "
+        broadcast = self.repository.get_broadcast(broadcast_id)
+        if not broadcast:
+            self.logger.error("[Broadcast] Difusión %d no encontrada", broadcast_id)
+            return
+        text = broadcast["text"]
+        interrupted = self.repository.mark_interrupted(broadcast_id)
+        if interrupted:
+            self.logger.warning(
+                "[Broadcast] Difusión %d: %d destinatarios quedaron en envío al interrumpirse; "
+                "se informan como '%s' y no se reenvían", broadcast_id, interrupted, UNKNOWN
+            )
+        remaining = broadcast["recipients"].get("pending", 0)
+        progress = {"sent": 0, "failed": 0, "blocked": 0, "remaining": remaining,
+                    UNKNOWN: interrupted, "rate": 0.0, "eta_seconds": None}
+        with self._lock:
+            self._progress[broadcast_id] = progress
+        start = last_report = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                chat_ids = self.repository.claim_pending(broadcast_id, self.batch_size)
+                if not chat_ids:
+                    break
+                results = list(executor.map(lambda chat_id: self._deliver(chat_id, text),
+                                            chat_ids))
+                self.repository.save_results(broadcast_id, results)
+                self.known_chats.mark_blocked(
+                    [chat_id for chat_id, status, _ in results if status == BLOCKED]
+                )
+                with self._lock:
+                    for _, status, _ in results:
+                        progress[status] += 1
+                    done = progress["sent"] + progress["failed"] + progress["blocked"]
+                    progress["remaining"] = max(0, remaining - done)
+                    elapsed = time.monotonic() - start
+                    progress["rate"] = done / elapsed if elapsed else 0.0
+                    progress["eta_seconds"] = (
+                        progress["remaining"] / progress["rate"] if progress["rate"] else None
+                    )
+                if time.monotonic() - last_report >= self.progress_interval:
+                    last_report = time.monotonic()
+                    self._log_progress(broadcast_id, progress)
+
+        self.repository.finish_broadcast(broadcast_id)
+        self._log_progress(broadcast_id, progress)
+        self.logger.info("[Broadcast] Difusión %d finalizada", broadcast_id)
+
+    def _deliver(self, chat_id: int, text: str) -> Tuple[int, str, Optional[str]]:
+        "Envía el mensaje a un chat respetando el límite de tasa y los 429 de Telegram."
+        result: Dict[str, Any] = {}
+        for _ in range(self.max_retries + 1):
+            self.limiter.acquire()
+            result = self.messaging_service.send_message_detailed(chat_id, text)
+            if result["ok"]:
+                return chat_id, SENT, None
+            if result["status_code"] == 403:
+                return chat_id, BLOCKED, result["error"]
+            if result["status_code"] == 429:
+                self.limiter.pause(float(result.get("retry_after") or 1))
+                continue
+            break
+        return chat_id, FAILED, result.get("error")
+
+    def _log_progress(self, broadcast_id: int, progress: Dict[str, Any]) -> None:
+        eta = progress["eta_seconds"]
+        self.logger.info(
+            "[Broadcast] Difusión %d: %d enviados, %d fallidos, %d bloqueados, "
+            "%d desconocidos, %d restantes, %.1f msg/s, ETA %s",
+            broadcast_id, progress["sent"], progress["failed"], progress["blocked"],
+            progress[UNKNOWN], progress["remaining"], progress["rate"],
+            f"{eta:.0f}s" if eta is not None else "-"
+        )
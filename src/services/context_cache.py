@@ -0,0 +1,194 @@
+"""
+Path: src/services/context_cache.py
+Caché del prefijo estático (instrucciones del sistema y documentos de referencia)
+para no reenviarlo ni refacturarlo en cada llamada a Gemini.
+"""
+
+import os
+import re
+import hashlib
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional
+from src.interfaces.context_cache_backend import IContextCacheBackend
+
+# CachedContent solo acepta modelos con versión fija; los alias sin versión que usan
+# DEFAULT_MODEL_NAME y las políticas de generación se traducen con esta tabla.
+CACHE_MODEL_VERSIONS = {
+    "gemini-1.5-flash": "gemini-1.5-flash-002",
+    "gemini-1.5-flash-8b": "gemini-1.5-flash-8b-001",
+    "gemini-1.5-pro": "gemini-1.5-pro-002",
+}
+_VERSION_SUFFIX = re.compile(r"-\d{3}$")
+
+
+def versioned_model_name(model_name: str,
+                         versions: Optional[Dict[str, str]] = None) -> str:
+    " Retorna el nombre con versión fija del modelo, requerido por CachedContent "
+    name = model_name[len("models/"):] if model_name.startswith("models/") else model_name
+    if _VERSION_SUFFIX.search(name):
+        return name
+    return (versions or CACHE_MODEL_VERSIONS).get(name, name)
+
+
+def load_reference_documents(directory: Optional[str]) -> List[str]:
+    " Lee los documentos de referencia (.md/.txt) del directorio, en orden alfabético "
+    if not directory or not os.path.isdir(directory):
+        return []
+    documents = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith((".md", ".txt")):
+            with open(os.path.join(directory, name), encoding="utf-8") as document:
+                documents.append(document.read())
+    return documents
+
+
+class GeminiContextCacheBackend(IContextCacheBackend):
+    " Backend basado en genai.caching.CachedContent "
+    def __init__(self,
+                 base_generation_config: Optional[Dict[str, Any]] = None,
+                 model_versions: Optional[Dict[str, str]] = None):
+        # Importación diferida: el modo caché es opcional.
+        import google.generativeai as genai  # pylint: disable=import-outside-toplevel
+        self._genai = genai
+        self.base_generation_config = base_generation_config
+        self.model_versions = model_versions
+
+    def create(self, model_name, system_instruction, documents, ttl_seconds) -> str:
+        "Registra el prefijo con CachedContent.create y retorna su nombre."
+        cached = self._genai.caching.CachedContent.create(
+            model=f"models/{versioned_model_name(model_name, self.model_versions)}",
+            system_instruction=system_instruction,
+            contents=documents or None,
+            ttl=timedelta(seconds=ttl_seconds),
+        )
+        return cached.name
+
+    def refresh(self, handle, ttl_seconds) -> None:
+        "Extiende el TTL del CachedContent."
+        cached = self._genai.caching.CachedContent.get(handle)
+        cached.update(ttl=timedelta(seconds=ttl_seconds))
+
+    def delete(self, handle) -> None:
+        "Elimina el CachedContent."
+        self._genai.caching.CachedContent.get(handle).delete()
+
+    def build_model(self, handle, model_name) -> Any:
+        "Construye un GenerativeModel a partir del CachedContent."
+        cached = self._genai.caching.CachedContent.get(handle)
+        return self._genai.GenerativeModel.from_cached_content(
+            cached_content=cached, generation_config=self.base_generation_config
+        )
+
+
+class ContextCacheManager:
+    """
+    Mantiene un handle de caché por modelo: lo registra la primera vez, lo refresca
+    antes de que venza el TTL y lo invalida cuando cambia el prefijo.
+    Si el backend no soporta caché para un modelo, get_model retorna None y el
+    llamador debe usar el modelo sin caché.
+    """
+    def __init__(self,
+                 backend: IContextCacheBackend,
+                 ttl_seconds: int = 3600,
+                 refresh_margin_seconds: int = 300,
+                 logger=None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.logger = logger
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._unsupported: Dict[str, float] = {}
+        self.system_instruction = ""
+        self.documents: List[str] = []
+        self.fingerprint = self._fingerprint("", [])
+
+    @staticmethod
+    def _fingerprint(system_instruction: str, documents: List[str]) -> str:
+        digest = hashlib.sha256(system_instruction.encode("utf-8"))
+        for document in documents:
+            digest.update(b"\0")
+            digest.update(document.encode("utf-8"))
+        return digest.hexdigest()
+
+    def set_context(self, system_instruction: str, documents: Optional[List[str]] = None) -> bool:
+        " Define el prefijo estático; retorna True si cambió y se invalidaron los handles "
+        documents = list(documents or [])
+        fingerprint = self._fingerprint(system_instruction, documents)
+        with self._lock:
+            if fingerprint == self.fingerprint:
+                return False
+            self.system_instruction = system_instruction
+            self.documents = documents
+            self.fingerprint = fingerprint
+            stale = list(self._entries.values())
+            self._entries.clear()
+            self._unsupported.clear()
+        for entry in stale:
+            self._safe_delete(entry["handle"])
+        if self.logger:
+            self.logger.info("[ContextCache] Prefijo actualizado; %d handles invalidados",
+                             len(stale))
+        return True
+
+    def get_model(self, model_name: str) -> Optional[Any]:
+        " Retorna un modelo que referencia el prefijo en caché, o None si no es posible "
+        with self._lock:
+            now = self.clock()
+            if self._unsupported.get(model_name, 0) > now:
+                return None
+            entry = self._entries.get(model_name)
+            if entry is not None and entry["expires_at"] - now <= self.refresh_margin_seconds:
+                try:
+                    self.backend.refresh(entry["handle"], self.ttl_seconds)
+                    entry["expires_at"] = now + self.ttl_seconds
+                    if self.logger:
+                        self.logger.debug("[ContextCache] Handle %s refrescado", entry["handle"])
+                except Exception as e:  # pylint: disable=broad-except
+                    # El handle pudo haber vencido en el backend: se registra uno nuevo.
+                    if self.logger:
+                        self.logger.warning("[ContextCache] No se pudo refrescar %s: %s",
+                                            entry["handle"], e)
+                    self._entries.pop(model_name, None)
+                    entry = None
+            if entry is None:
+                try:
+                    entry = self._create_locked(model_name, now)
+                except Exception as e:  # pylint: disable=broad-except
+                    # El backend puede no soportar caché (modelo sin versión, prefijo por
+                    # debajo del mínimo de tokens, etc.): se usa el modo sin caché y se
+                    # reintenta recién después de un TTL.
+                    self._unsupported[model_name] = now + self.ttl_seconds
+                    if self.logger:
+                        self.logger.warning(
+                            "[ContextCache] Caché no disponible para %s, modo sin caché: %s",
+                            model_name, e
+                        )
+                    return None
+            return entry["model"]
+
+    def _create_locked(self, model_name: str, now: float) -> Dict[str, Any]:
+        handle = self.backend.create(
+            model_name, self.system_instruction, self.documents, self.ttl_seconds
+        )
+        entry = {
+            "handle": handle,
+            "expires_at": now + self.ttl_seconds,
+            "model": self.backend.build_model(handle, model_name),
+        }
+        self._entries[model_name] = entry
+        if self.logger:
+            self.logger.info("[ContextCache] Prefijo registrado para %s con handle %s",
+                             model_name, handle)
+        return entry
+
+    def _safe_delete(self, handle: str) -> None:
+        try:
+            self.backend.delete(handle)
+        except Exception as e:  # pylint: disable=broad-except
+            if self.logger:
+                self.logger.debug("[ContextCache] No se pudo eliminar el handle %s: %s", handle, e)
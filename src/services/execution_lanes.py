@@ -0,0 +1,89 @@
+"""
+Path: src/services/execution_lanes.py
+Carriles de ejecución con pools de hilos independientes, para que las respuestas
+inmediatas no esperen detrás de generaciones largas de Gemini.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from src.utils.latency_sketch import LatencySketch
+
+INSTANT = "instant"
+SHORT = "short"
+LONG = "long"
+DEFAULT_LANE_WORKERS = {INSTANT: 4, SHORT: 8, LONG: 4}
+
+
+class ExecutionLanes:
+    " Pools de hilos por carril con límite de concurrencia y métricas de latencia "
+    def __init__(self, lane_workers: Optional[Dict[str, int]] = None, logger=None):
+        self.logger = logger
+        self.lane_workers = dict(DEFAULT_LANE_WORKERS)
+        self.lane_workers.update(lane_workers or {})
+        self._executors = {
+            lane: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"lane-{lane}")
+            for lane, workers in self.lane_workers.items()
+        }
+        self._lock = threading.Lock()
+        self._stats = {
+            lane: {
+                "queued": 0, "running": 0, "completed": 0, "failed": 0,
+                "latency": LatencySketch(),
+            }
+            for lane in self.lane_workers
+        }
+
+    def submit(self, lane: str, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        " Encola fn en el carril indicado; la latencia se mide desde el encolado "
+        if lane not in self._executors:
+            raise ValueError(f"Carril desconocido: {lane}")
+        enqueued = time.perf_counter()
+        with self._lock:
+            self._stats[lane]["queued"] += 1
+        return self._executors[lane].submit(self._run, lane, enqueued, fn, *args, **kwargs)
+
+    def _run(self, lane: str, enqueued: float, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        stats = self._stats[lane]
+        with self._lock:
+            stats["queued"] -= 1
+            stats["running"] += 1
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:  # pylint: disable=broad-except
+            with self._lock:
+                stats["failed"] += 1
+            if self.logger:
+                self.logger.exception("[ExecutionLanes] Error en el carril %s: %s", lane, e)
+            return None
+        finally:
+            elapsed_ms = (time.perf_counter() - enqueued) * 1000
+            with self._lock:
+                stats["running"] -= 1
+                stats["completed"] += 1
+                stats["latency"].add(elapsed_ms)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Retorna, por carril, trabajos en cola/en curso/completados/fallidos y latencia
+        p50/p95 (ms).
+        """
+        with self._lock:
+            return {
+                lane: {
+                    "workers": self.lane_workers[lane],
+                    "queued": stats["queued"],
+                    "running": stats["running"],
+                    "completed": stats["completed"],
+                    "failed": stats["failed"],
+                    "latency_p50_ms": stats["latency"].quantile(0.5),
+                    "latency_p95_ms": stats["latency"].quantile(0.95),
+                }
+                for lane, stats in self._stats.items()
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        " Detiene los pools de todos los carriles "
+        for executor in self._executors.values():
+            executor.shutdown(wait=wait)
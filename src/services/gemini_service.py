@@ -2,32 +2,53 @@
 Path: src/services/gemini_service.py
 """
 
+import threading
+from typing import Optional, Dict, Any, List, Union
 import google.generativeai as genai
 from grpc import RpcError
 from google.api_core.exceptions import GoogleAPIError
+from src.services.context_cache import ContextCacheManager
+from src.utils.profiling import stage
+
+DEFAULT_MODEL_NAME = "gemini-1.5-flash"
+BASE_GENERATION_CONFIG = {
+    "temperature": 1,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 8192,
+    "response_mime_type": "text/plain",
+}
 
 class GeminiService:
     " Servicio para interactuar con el modelo de lenguaje Gemini "
-    def __init__(self, api_key: str, system_instruction: str, logger=None):
+    def __init__(self,
+                 api_key: str,
+                 system_instruction: str,
+                 logger=None,
+                 context_cache: Optional[ContextCacheManager] = None):
         self.logger = logger
         self.api_key = api_key
         self.system_instruction = system_instruction
+        # Modo caché: el prefijo estático se registra una vez y se referencia por handle.
+        self.context_cache = context_cache
         genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel(
-            model_name="gemini-1.5-flash",
-            generation_config={
-                "temperature": 1,
-                "top_p": 0.95,
-                "top_k": 40,
-                "max_output_tokens": 8192,
-                "response_mime_type": "text/plain",
-            },
-            system_instruction=self.system_instruction
-        )
+        self.models = {}  # Modelos construidos una sola vez por nombre
+        self.model = self._get_model(DEFAULT_MODEL_NAME)
         self.chat_session = None
         self.chat_history = []  # Nuevo buffer para almacenar el historial de chat
+        # Historial en formato de contenidos de Gemini, compartido por todos los modelos.
+        # Cada llamada de send_message envía una copia, por lo que no hay una sesión
+        # compartida que cambiar de modelo mientras otro hilo la usa.
+        self.history_contents: List[Dict[str, Any]] = []
+        self._history_lock = threading.Lock()
+        self._local = threading.local()
         self.logger.info("GeminiService inicializado correctamente.")
 
+    @property
+    def last_token_count(self) -> int:
+        "Tokens de la última respuesta de send_message generada en el hilo actual."
+        return getattr(self._local, "token_count", 0)
+
     def _is_critical_exception(self, e: Exception) -> bool:
         """
         Clasifica la excepción como crítica o no crítica.
@@ -39,11 +60,46 @@ class GeminiService:
             return False
         return True
 
+    def _get_model(self, model_name: str):
+        "Retorna el GenerativeModel del nombre indicado, creándolo solo la primera vez."
+        if self.context_cache:
+            cached_model = self.context_cache.get_model(model_name)
+            if cached_model is not None:
+                return cached_model
+        model = self.models.get(model_name)
+        if model is None:
+            model = genai.GenerativeModel(
+                model_name=model_name,
+                generation_config=BASE_GENERATION_CONFIG,
+                system_instruction=self.system_instruction
+            )
+            self.models[model_name] = model
+        return model
+
+    def update_system_instruction(self, system_instruction: str) -> bool:
+        """
+        Actualiza las instrucciones del sistema e invalida modelos, caché y sesión.
+        Retorna True si las instrucciones cambiaron.
+        """
+        if system_instruction == self.system_instruction:
+            return False
+        self.system_instruction = system_instruction
+        self.models = {}
+        if self.context_cache:
+            self.context_cache.set_context(system_instruction, self.context_cache.documents)
+        self.model = self._get_model(DEFAULT_MODEL_NAME)
+        self.chat_session = None
+        with self._history_lock:
+            self.history_contents = []
+        self.logger.info("Instrucciones del sistema actualizadas; sesión reiniciada.")
+        return True
+
     def _start_chat_session(self):
         if self.chat_session:
             self.logger.debug("Verificando sesión actual con ping.")
             try:
-                _ = self.chat_session.send_message("ping")
+                with stage("gemini.ping"):
+                    _ = self.chat_session.send_message("ping")
                 self.logger.debug("Ping exitoso; la sesión se mantiene activa.")
             except (RpcError, GoogleAPIError) as e:
                 self.logger.warning("Ping fallido. Detalle: %s", e)
@@ -62,21 +118,63 @@ class GeminiService:
                 self.logger.exception("Error iniciando sesión de chat en Gemini: %s", e)
                 raise
 
-    def send_message(self, message: str) -> str:
-        " Send a message to the Gemini model and return the full response as text. "
-        self._start_chat_session()
-        self.logger.debug("Enviando mensaje: %s", message)
+    def send_message(self,
+                     message: Union[str, List[Any]],
+                     model_name: Optional[str] = None,
+                     generation_config: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Send a message to the Gemini model and return the full response as text.
+        Safe to call from several threads: each call sends a snapshot of the shared
+        history to the requested model, and the token count is kept per thread
+        (see last_token_count).
+
+        Args:
+            message (Union[str, List[Any]]): The message to send, or a list of parts
+                (text and {"mime_type", "data"} dicts) for multimodal input.
+            model_name (Optional[str]): Model to use for this call; defaults to DEFAULT_MODEL_NAME.
+            generation_config (Optional[Dict[str, Any]]): Per-call overrides of the
+                generation config (e.g. max_output_tokens, temperature).
+        """
+        model = self._get_model(model_name or DEFAULT_MODEL_NAME)
+        history_message = self._describe_message(message)
+        parts = [message] if isinstance(message, str) else list(message)
+        self._local.token_count = 0
+        self.logger.debug("Enviando mensaje: %s", history_message)
+        with self._history_lock:
+            contents = list(self.history_contents)
+        contents.append({"role": "user", "parts": parts})
         try:
-            response = self.chat_session.send_message(message)
-            # Actualizar historial
-            self.chat_history.append({"role": "user", "message": message})
-            self.chat_history.append({"role": "gemini", "message": response.text})
+            with stage("gemini.generate"):
+                response = model.generate_content(contents, generation_config=generation_config)
+            self._local.token_count = self._token_count(response)
+            # Actualizar historial (los adjuntos se guardan solo como descripción)
+            with self._history_lock:
+                self.history_contents.append({"role": "user", "parts": [history_message]})
+                self.history_contents.append({"role": "model", "parts": [response.text]})
+                self.chat_history.append({"role": "user", "message": history_message})
+                self.chat_history.append({"role": "gemini", "message": response.text})
             self.logger.debug("Historial actualizado: %s", self.chat_history)
             return response.text
         except Exception as e:
             self.logger.error("Error al enviar mensaje a Gemini: %s", e)
             raise
 
+    @staticmethod
+    def _describe_message(message: Union[str, List[Any]]) -> str:
+        "Representación textual del mensaje para historial y logs (sin datos binarios)."
+        if isinstance(message, str):
+            return message
+        return " ".join(
+            part if isinstance(part, str) else f"[adjunto {part.get('mime_type')}]"
+            for part in message
+        )
+
+    @staticmethod
+    def _token_count(response) -> int:
+        "Retorna el total de tokens informado por la respuesta, o 0 si no está disponible."
+        usage = getattr(response, "usage_metadata", None)
+        return getattr(usage, "total_token_count", 0) or 0
+
     def send_message_streaming(self, message: str, chunk_size: int = 30) -> str:
         """
         Send a message to the Gemini model and receive a streaming response.
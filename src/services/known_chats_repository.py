@@ -0,0 +1,105 @@
+"""
+Path: src/services/known_chats_repository.py
+Repositorio de los chats conocidos por el bot (audiencia de las difusiones).
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from src.services.database_connection_manager import DatabaseConnectionManager
+
+
+class KnownChatsRepository:
+    " Repositorio para la tabla known_chats "
+    def __init__(self,
+                 connection_manager: DatabaseConnectionManager,
+                 logger=None,
+                 refresh_seconds: int = 3600):
+        self.connection_manager = connection_manager
+        self.logger = logger
+        # Evita escribir en la BD en cada update: last_seen se actualiza como
+        # máximo una vez cada refresh_seconds por chat.
+        self.refresh_seconds = refresh_seconds
+        self._last_written: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def initialize_table(self):
+        " Crea la tabla de chats conocidos si no existe "
+        with self.connection_manager.get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS known_chats (
+                        chat_id BIGINT PRIMARY KEY,
+                        type VARCHAR(32) NOT NULL,
+                        title VARCHAR(255),
+                        username VARCHAR(255),
+                        first_seen DATETIME NOT NULL,
+                        last_seen DATETIME NOT NULL,
+                        blocked BOOLEAN NOT NULL DEFAULT FALSE,
+                        INDEX idx_known_chats_last_seen (last_seen)
+                    );
+                """)
+                connection.commit()
+                self.logger.debug("Tabla 'known_chats' verificada/creada.")
+
+    def register(self, chat: Dict[str, Any]) -> None:
+        " Registra o actualiza un chat visto en un update "
+        chat_id = int(chat["id"])
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_written.get(chat_id)
+            if last is not None and now - last < self.refresh_seconds:
+                return
+            self._last_written[chat_id] = now
+        title = chat.get("title") or " ".join(
+            part for part in (chat.get("first_name"), chat.get("last_name")) if part
+        )
+        with self.connection_manager.get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO known_chats
+                        (chat_id, type, title, username, first_seen, last_seen, blocked)
+                    VALUES (%s, %s, %s, %s, NOW(), NOW(), FALSE)
+                    ON DUPLICATE KEY UPDATE
+                        type = VALUES(type),
+                        title = VALUES(title),
+                        username = VALUES(username),
+                        last_seen = NOW(),
+                        blocked = FALSE;
+                """, (chat_id, chat.get("type", "private"), title or None, chat.get("username")))
+                connection.commit()
+
+    def find_audience(self,
+                      chat_types: Optional[List[str]] = None,
+                      active_since_days: Optional[int] = None) -> List[int]:
+        " Retorna los chat_id no bloqueados que cumplen con el filtro de audiencia "
+        query = "SELECT chat_id FROM known_chats WHERE blocked = FALSE"
+        params: List[Any] = []
+        if chat_types:
+            query += f" AND type IN ({', '.join(['%s'] * len(chat_types))})"
+            params.extend(chat_types)
+        if active_since_days:
+            query += " AND last_seen >= %s"
+            params.append(datetime.now() - timedelta(days=int(active_since_days)))
+        with self.connection_manager.get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(query + " ORDER BY chat_id;", params)
+                return [row[0] for row in cursor.fetchall()]
+
+    def mark_blocked(self, chat_ids: List[int]) -> None:
+        " Marca chats que bloquearon al bot (403) para excluirlos de futuras difusiones "
+        if not chat_ids:
+            return
+        with self.connection_manager.get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE known_chats SET blocked = TRUE "
+                    f"WHERE chat_id IN ({', '.join(['%s'] * len(chat_ids))});",
+                    chat_ids
+                )
+                connection.commit()
+        with self._lock:
+            for chat_id in chat_ids:
+                self._last_written.pop(chat_id, None)
+        self.logger.info("[KnownChats] %d chats marcados como bloqueados", len(chat_ids))
@@ -0,0 +1,228 @@
+"""
+Path: src/services/media_service.py
+Pipeline de adjuntos (fotos, documentos y notas de voz) hacia Gemini.
+------------------------------------------------------------------------------
+- Resuelve el archivo con getFile y lo descarga en bloques a un archivo temporal
+  en disco, cortando la descarga si supera max_bytes.
+- Las imágenes se reducen en un pool de procesos para no ocupar el hilo de la
+  solicitud ni el GIL; el proceso recibe la ruta del archivo, no sus bytes. De las
+  fotos se descarga el tamaño más cercano a max_image_side. Las notas de voz
+  (audio/ogg) y los PDF se envían tal cual, ya que Gemini los acepta de forma nativa.
+- El resultado se cachea por file_unique_id para no reprocesar reenvíos.
+- Se informa la memoria residente actual del proceso antes y después de cada adjunto.
+------------------------------------------------------------------------------
+"""
+
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+import requests
+from src.services.telegram_service import TelegramService
+
+try:
+    import win32api
+    import win32process
+except ImportError:  # Solo disponible en Windows (pywin32)
+    win32api = win32process = None
+
+DEFAULT_MIME_TYPES = {
+    "photo": "image/jpeg",
+    "voice": "audio/ogg",
+    "audio": "audio/mpeg",
+    "document": "application/pdf",
+}
+SUPPORTED_MIME_PREFIXES = ("image/", "audio/", "application/pdf", "text/")
+
+
+class MediaTooLargeError(ValueError):
+    " El adjunto supera el tamaño máximo permitido "
+
+
+class UnsupportedMediaError(ValueError):
+    " El tipo de adjunto no es soportado por Gemini "
+
+
+def downscale_image(path: str, max_side: int, mime_type: str) -> Tuple[bytes, str]:
+    """
+    Reduce la imagen del archivo para que su lado mayor no supere max_side y la
+    recodifica en JPEG. Se ejecuta en un proceso del pool, que lee el archivo por sí
+    mismo. Si Pillow no puede decodificarla (p. ej. HEIC), lanza UnsupportedMediaError.
+    """
+    from PIL import Image  # pylint: disable=import-outside-toplevel
+    try:
+        with Image.open(path) as image:
+            if max(image.size) <= max_side and image.format == "JPEG":
+                return read_file(path), "image/jpeg"
+            image.thumbnail((max_side, max_side))
+            output = io.BytesIO()
+            image.convert("RGB").save(output, format="JPEG", quality=85, optimize=True)
+            return output.getvalue(), "image/jpeg"
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        # PIL.UnidentifiedImageError es un OSError.
+        raise UnsupportedMediaError(f"No se pudo decodificar la imagen ({mime_type}): {e}") from e
+
+
+def read_file(path: str) -> bytes:
+    " Lee el archivo completo "
+    with open(path, "rb") as source:
+        return source.read()
+
+
+def pillow_available() -> bool:
+    " Indica si Pillow está instalado para reducir imágenes "
+    try:
+        import PIL  # pylint: disable=import-outside-toplevel,unused-import
+    except ImportError:
+        return False
+    return True
+
+
+def current_rss_kb() -> Optional[int]:
+    " Retorna la memoria residente actual del proceso en KB, o None si no está disponible "
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    if win32process is not None:
+        counters = win32process.GetProcessMemoryInfo(win32api.GetCurrentProcess())
+        return counters["WorkingSetSize"] // 1024
+    return None
+
+
+class MediaService:
+    " Descarga y prepara adjuntos de Telegram como entrada multimodal para Gemini "
+    def __init__(self,
+                 telegram_service: TelegramService,
+                 logger=None,
+                 max_bytes: int = 20 * 1024 * 1024,
+                 chunk_size: int = 64 * 1024,
+                 max_image_side: int = 1600,
+                 cache_bytes: int = 32 * 1024 * 1024,
+                 workers: int = 2):
+        self.telegram_service = telegram_service
+        self.logger = logger
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.max_image_side = max_image_side
+        self.cache_bytes = cache_bytes
+        self.workers = workers
+        self._executor = None
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_size = 0
+        self._lock = threading.Lock()
+        self._pillow = pillow_available()
+        if not self._pillow and self.logger:
+            self.logger.warning(
+                "[MediaService] Pillow no está instalado; las imágenes no se reducen"
+            )
+
+    def build_part(self, media: Dict[str, Any]) -> Dict[str, Any]:
+        " Retorna el adjunto como parte multimodal {'mime_type', 'data'} para Gemini "
+        cache_key = media["file_unique_id"]
+        with self._lock:
+            part = self._cache.get(cache_key)
+            if part is not None:
+                self._cache.move_to_end(cache_key)
+                self.logger.debug("[MediaService] Adjunto %s obtenido de la caché", cache_key)
+                return part
+
+        mime_type = media.get("mime_type") or DEFAULT_MIME_TYPES.get(media["kind"], "")
+        if not mime_type.startswith(SUPPORTED_MIME_PREFIXES):
+            raise UnsupportedMediaError(f"Tipo de adjunto no soportado: {mime_type}")
+        if media.get("file_size") and media["file_size"] > self.max_bytes:
+            raise MediaTooLargeError(
+                f"El adjunto ocupa {media['file_size']} bytes (máximo {self.max_bytes})"
+            )
+
+        rss_before = current_rss_kb()
+        success, file_info = self.telegram_service.get_file(media["file_id"])
+        if not success or "file_path" not in file_info:
+            raise ConnectionError(f"No se pudo resolver el archivo: {file_info}")
+
+        path, downloaded = self._download(file_info["file_path"])
+        try:
+            if mime_type.startswith("image/") and self._pillow:
+                # Solo la ruta cruza al proceso; vuelve la imagen ya reducida.
+                data, mime_type = self._get_executor().submit(
+                    downscale_image, path, self.max_image_side, mime_type
+                ).result(timeout=30)
+            else:
+                # Gemini recibe los datos en línea, por lo que PDF y audio se leen completos.
+                data = read_file(path)
+        finally:
+            os.remove(path)
+
+        part = {"mime_type": mime_type, "data": data}
+        self._cache_put(cache_key, part)
+        rss_after = current_rss_kb()
+        if rss_before is not None:
+            self.logger.info(
+                "[MediaService] Adjunto %s (%s): %d bytes descargados, %d enviados, "
+                "RSS actual %d KB (%+d KB)",
+                media["kind"], mime_type, downloaded, len(data), rss_after, rss_after - rss_before
+            )
+        return part
+
+    def _cache_put(self, cache_key: str, part: Dict[str, Any]) -> None:
+        "Guarda el adjunto procesado en la caché LRU, acotada por cache_bytes."
+        size = len(part["data"])
+        if size > self.cache_bytes // 4:
+            return
+        with self._lock:
+            if cache_key in self._cache:
+                return
+            self._cache[cache_key] = part
+            self._cache_size += size
+            while self._cache_size > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_size -= len(evicted["data"])
+
+    def _download(self, file_path: str) -> Tuple[str, int]:
+        """
+        Descarga el archivo en bloques a un archivo temporal en disco, respetando
+        max_bytes. Retorna (ruta, bytes descargados); el llamador debe eliminarlo.
+        """
+        url = self.telegram_service.file_download_url(file_path)
+        handle, path = tempfile.mkstemp(prefix="profebot-media-")
+        received = 0
+        try:
+            with os.fdopen(handle, "wb") as target:
+                with requests.get(url, stream=True, timeout=30) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        received += len(chunk)
+                        if received > self.max_bytes:
+                            raise MediaTooLargeError(
+                                f"El adjunto supera el máximo de {self.max_bytes} bytes"
+                            )
+                        target.write(chunk)
+        except requests.exceptions.RequestException as e:
+            os.remove(path)
+            raise ConnectionError(f"Error descargando adjunto: {e}") from e
+        except BaseException:
+            os.remove(path)
+            raise
+        return path, received
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: un fork copiaría el proceso con hilos de Flask, carriles y locks
+                # tomados; los workers solo importan este módulo.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def shutdown(self) -> None:
+        " Libera el pool de procesos "
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
@@ -0,0 +1,122 @@
+"""
+Path: src/services/relevance_gate.py
+Filtro previo al LLM para chats grupales: solo se invoca a Gemini cuando el mensaje
+está dirigido al bot (mención, respuesta a un mensaje del bot o comando).
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+from src.services.telegram_service import TelegramService
+
+GROUP_CHAT_TYPES = ("group", "supergroup")
+
+
+class RelevanceGate:
+    " Decide si un mensaje de grupo está dirigido al bot, usando la identidad de getMe "
+    def __init__(self,
+                 telegram_service: TelegramService,
+                 logger=None,
+                 retry_seconds: float = 60.0):
+        self.telegram_service = telegram_service
+        self.logger = logger
+        self.retry_seconds = retry_seconds
+        self._identity: Optional[Dict[str, Any]] = None
+        self._next_attempt = 0.0
+        self._lock = threading.Lock()
+        self._counters = {"group_messages": 0, "addressed": 0, "llm_calls_avoided": 0}
+
+    def identity(self) -> Optional[Dict[str, Any]]:
+        " Retorna {'id', 'username'} del bot, consultando getMe una sola vez "
+        if self._identity is not None:
+            return self._identity
+        with self._lock:
+            if self._identity is not None or time.monotonic() < self._next_attempt:
+                return self._identity
+            success, result = self.telegram_service.get_me()
+            if success and result.get("id"):
+                self._identity = {
+                    "id": result["id"],
+                    "username": (result.get("username") or "").lower(),
+                }
+                if self.logger:
+                    self.logger.info("[RelevanceGate] Identidad del bot: @%s",
+                                     self._identity["username"])
+            else:
+                self._next_attempt = time.monotonic() + self.retry_seconds
+                if self.logger:
+                    self.logger.warning("[RelevanceGate] No se pudo obtener getMe: %s", result)
+        return self._identity
+
+    def is_addressed(self,
+                     message: Dict[str, Any],
+                     record: bool = True,
+                     llm_bound: bool = True) -> bool:
+        """
+        Indica si el mensaje requiere respuesta del bot. Los chats privados siempre la
+        requieren; en grupos, solo las menciones, respuestas al bot y comandos propios.
+        Si la identidad del bot no está disponible, deja pasar el mensaje.
+        llm_bound indica si, de estar dirigido al bot, el mensaje llegaría a Gemini; solo
+        esos mensajes cuentan como llamadas evitadas (no stickers ni mensajes de servicio).
+        """
+        if (message.get("chat") or {}).get("type") not in GROUP_CHAT_TYPES:
+            return True
+        identity = self.identity()
+        addressed = identity is None or self._addressed_to(message, identity)
+        if record:
+            with self._lock:
+                self._counters["group_messages"] += 1
+                if addressed:
+                    self._counters["addressed"] += 1
+                elif llm_bound:
+                    self._counters["llm_calls_avoided"] += 1
+        return addressed
+
+    def addressed_if_known(self, message: Dict[str, Any]) -> Optional[bool]:
+        """
+        Variante sin bloqueo para el hilo del webhook: usa solo la identidad ya cacheada
+        (nunca llama a getMe) y no actualiza contadores. Retorna None si el mensaje es de
+        un grupo y la identidad todavía no se conoce.
+        """
+        if (message.get("chat") or {}).get("type") not in GROUP_CHAT_TYPES:
+            return True
+        identity = self._identity
+        if identity is None:
+            return None
+        return self._addressed_to(message, identity)
+
+    def stats(self) -> Dict[str, int]:
+        " Retorna los contadores del filtro "
+        with self._lock:
+            return dict(self._counters)
+
+    @staticmethod
+    def _addressed_to(message: Dict[str, Any], identity: Dict[str, Any]) -> bool:
+        reply_to = message.get("reply_to_message") or {}
+        if (reply_to.get("from") or {}).get("id") == identity["id"]:
+            return True
+        text = message.get("text") or message.get("caption") or ""
+        entities = message.get("entities") or message.get("caption_entities") or []
+        if not entities:
+            return False
+        # Los offsets de las entidades de Telegram están en unidades UTF-16.
+        encoded = text.encode("utf-16-le")
+        for entity in entities:
+            entity_type = entity.get("type")
+            if entity_type == "text_mention":
+                if (entity.get("user") or {}).get("id") == identity["id"]:
+                    return True
+                continue
+            if entity_type not in ("mention", "bot_command"):
+                continue
+            start = entity.get("offset", 0) * 2
+            value = encoded[start:start + entity.get("length", 0) * 2].decode(
+                "utf-16-le", errors="ignore"
+            ).lower()
+            if entity_type == "mention" and value[1:] == identity["username"]:
+                return True
+            if entity_type == "bot_command" and entity.get("offset", 0) == 0:
+                target = value.split("@", 1)[1] if "@" in value else None
+                if target is None or target == identity["username"]:
+                    return True
+        return False
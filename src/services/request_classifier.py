@@ -0,0 +1,125 @@
+"""
+Path: src/services/request_classifier.py
+Clasificador de solicitudes que elige la configuración de generación de Gemini
+(modelo, tope de tokens de salida y temperatura) para cada mensaje.
+"""
+
+import json
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+# Tabla de políticas por defecto. Cada clase define los parámetros que se
+# pasan a GeminiService.send_message como overrides por llamada.
+DEFAULT_POLICIES: Dict[str, Dict[str, Any]] = {
+    "saludo": {
+        "model_name": "gemini-1.5-flash-8b",
+        "max_output_tokens": 256,
+        "temperature": 0.7,
+    },
+    "corta": {
+        "model_name": "gemini-1.5-flash",
+        "max_output_tokens": 1024,
+        "temperature": 0.8,
+    },
+    "explicacion": {
+        "model_name": "gemini-1.5-flash",
+        "max_output_tokens": 8192,
+        "temperature": 1,
+    },
+}
+
+GREETING_WORDS = ("hola", "buenas", "buen dia", "buen día", "saludos", "gracias", "chau", "ok")
+EXPLANATION_MARKERS = (
+    "explica", "explicá", "explicame", "explícame", "desarrolla", "desarrollá",
+    "resumen", "resumí", "resume", "por qué", "cómo funciona", "como funciona",
+    "diferencia entre", "paso a paso", "ejemplos",
+)
+
+
+class RequestClassifier:
+    " Clasifica mensajes en clases de política a partir de características baratas "
+    def __init__(self,
+                 policies: Optional[Dict[str, Dict[str, Any]]] = None,
+                 long_message_words: int = 40,
+                 deep_history_turns: int = 10,
+                 logger=None):
+        self.logger = logger
+        self.policies = {name: dict(policy) for name, policy in DEFAULT_POLICIES.items()}
+        for name, policy in (policies or {}).items():
+            self.policies.setdefault(name, {}).update(policy)
+        self.long_message_words = long_message_words
+        self.deep_history_turns = deep_history_turns
+
+    @staticmethod
+    def load_policies(raw: Optional[str]) -> Dict[str, Dict[str, Any]]:
+        " Interpreta la tabla de políticas configurada como JSON; vacía si no es válida "
+        if not raw:
+            return {}
+        try:
+            policies = json.loads(raw)
+        except ValueError:
+            return {}
+        if not isinstance(policies, dict):
+            return {}
+        return {name: policy for name, policy in policies.items() if isinstance(policy, dict)}
+
+    def classify(self, message: str, history_depth: int = 0) -> str:
+        """
+        Retorna el nombre de la clase de política para el mensaje. history_depth es la
+        cantidad de turnos previos del mismo chat.
+        """
+        text = (message or "").strip().lower()
+        words = len(text.split())
+        if words <= 4 and "?" not in text and text.startswith(GREETING_WORDS):
+            return "saludo"
+        if words >= self.long_message_words:
+            return "explicacion"
+        if any(marker in text for marker in EXPLANATION_MARKERS):
+            return "explicacion"
+        # En conversaciones largas del mismo chat, las preguntas breves suelen ser de
+        # seguimiento; al comienzo, una pregunta de varias palabras abre un tema nuevo.
+        if "?" in text and words >= 8 and history_depth < self.deep_history_turns:
+            return "explicacion"
+        return "corta"
+
+    def get_policy(self, policy_name: str) -> Tuple[Optional[str], Dict[str, Any]]:
+        " Retorna (model_name, generation_config) de la clase indicada "
+        policy = dict(self.policies.get(policy_name) or self.policies["corta"])
+        model_name = policy.pop("model_name", None)
+        return model_name, policy
+
+
+class PolicyStats:
+    " Acumula latencia y tokens por clase de política de forma segura entre hilos "
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, float]] = {}
+
+    def record(self, policy_name: str, latency: float, tokens: int) -> None:
+        " Registra una respuesta generada con la política indicada "
+        with self._lock:
+            totals = self._totals.setdefault(
+                policy_name, {"count": 0, "latency": 0.0, "tokens": 0}
+            )
+            totals["count"] += 1
+            totals["latency"] += latency
+            totals["tokens"] += tokens
+
+    def averages(self, policy_name: str) -> Dict[str, float]:
+        " Retorna promedio de latencia (s) y tokens por respuesta de la política "
+        with self._lock:
+            totals = self._totals.get(policy_name)
+            if not totals or not totals["count"]:
+                return {"count": 0, "latency": 0.0, "tokens": 0.0}
+            count = totals["count"]
+            return {
+                "count": count,
+                "latency": totals["latency"] / count,
+                "tokens": totals["tokens"] / count,
+            }
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        " Retorna los promedios de todas las políticas registradas "
+        with self._lock:
+            names = list(self._totals)
+        return {name: self.averages(name) for name in names}
@@ -2,7 +2,7 @@
 Path: src/services/telegram_messaging_service.py
 """
 
-from typing import Tuple, Optional, Any
+from typing import Tuple, Optional, Any, Dict, List
 import requests
 from src.configuration.central_config import CentralConfig
 from src.interfaces.messaging_service import IMessagingService
@@ -37,6 +37,33 @@ class TelegramMessagingService(IMessagingService):
         except requests.exceptions.RequestException as e:
             return False, f"Error enviando mensaje: {e}"
 
+    def send_message_detailed(self, chat_id: int, text: str) -> Dict[str, Any]:
+        " Envía un mensaje e informa código de estado y retry_after (429) de Telegram."
+        token = CentralConfig.TELEGRAM_TOKEN
+        if not token:
+            return {"ok": False, "status_code": None, "error": "TELEGRAM_TOKEN no definido",
+                    "retry_after": None}
+        url = f"https://api.telegram.org/bot{token}/sendMessage"
+        payload = {"chat_id": chat_id, "text": text}
+        try:
+            response = requests.post(url, json=payload, timeout=10)
+        except requests.exceptions.RequestException as e:
+            return {"ok": False, "status_code": None, "error": f"Error enviando mensaje: {e}",
+                    "retry_after": None}
+        if response.ok:
+            return {"ok": True, "status_code": response.status_code, "error": None,
+                    "retry_after": None}
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        return {
+            "ok": False,
+            "status_code": response.status_code,
+            "error": body.get("description") or response.reason,
+            "retry_after": (body.get("parameters") or {}).get("retry_after"),
+        }
+
     @staticmethod
     def get_webhook_info() -> Tuple[bool, Any]:
         " Obtiene información del webhook configurado en Telegram."
@@ -55,18 +82,12 @@ class TelegramMessagingService(IMessagingService):
             return False, f"Error obteniendo información del webhook: {str(e)}"
 
     @staticmethod
-    def configure_webhook(url: str) -> Tuple[bool, Optional[str]]:
-        " Configura el webhook de Telegram."
-        valid, error_msg = TelegramMessagingService.validate_token()
-        if not valid:
-            return False, error_msg
-
-        token = CentralConfig.TELEGRAM_TOKEN
-        set_webhook_url = f"https://api.telegram.org/bot{token}/setWebhook?url={url}"
-
-        try:
-            response = requests.get(set_webhook_url, timeout=10)
-            response.raise_for_status()
-            return True, None
-        except requests.exceptions.RequestException as e:
-            return False, f"Error configurando webhook: {str(e)}"
+    def configure_webhook(url: str,
+                          max_connections: Optional[int] = None,
+                          allowed_updates: Optional[List[str]] = None,
+                          drop_pending_updates: bool = False,
+                          secret_token: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        " Configura el webhook de Telegram con todos los parámetros de setWebhook."
+        return TelegramService.configure_webhook(
+            url, max_connections, allowed_updates, drop_pending_updates, secret_token
+        )
@@ -4,7 +4,7 @@ Servicio para interactuar con la API de Telegram.
 Encapsula toda la lógica de comunicación con Telegram.
 """
 
-from typing import Tuple, Any, Optional
+from typing import Tuple, Any, Optional, List
 import requests
 from src.configuration.central_config import CentralConfig
 
@@ -37,6 +37,45 @@ class TelegramService:
         except requests.exceptions.RequestException as e:
             return False, f"Error obteniendo información del webhook: {str(e)}"
 
+    @staticmethod
+    def get_me() -> Tuple[bool, Any]:
+        " Obtiene la identidad del bot (id y username) mediante getMe."
+        valid, error_msg = TelegramService.validate_token()
+        if not valid:
+            return False, error_msg
+
+        token = CentralConfig.TELEGRAM_TOKEN
+        get_me_url = f"https://api.telegram.org/bot{token}/getMe"
+
+        try:
+            response = requests.get(get_me_url, timeout=10)
+            response.raise_for_status()
+            return True, response.json().get("result", {})
+        except requests.exceptions.RequestException as e:
+            return False, f"Error obteniendo identidad del bot: {str(e)}"
+
+    @staticmethod
+    def get_file(file_id: str) -> Tuple[bool, Any]:
+        " Obtiene el objeto File de Telegram (incluye file_path) para un file_id."
+        valid, error_msg = TelegramService.validate_token()
+        if not valid:
+            return False, error_msg
+
+        token = CentralConfig.TELEGRAM_TOKEN
+        get_file_url = f"https://api.telegram.org/bot{token}/getFile"
+
+        try:
+            response = requests.get(get_file_url, params={"file_id": file_id}, timeout=10)
+            response.raise_for_status()
+            return True, response.json().get("result", {})
+        except requests.exceptions.RequestException as e:
+            return False, f"Error obteniendo archivo: {str(e)}"
+
+    @staticmethod
+    def file_download_url(file_path: str) -> str:
+        " Construye la URL de descarga de un archivo a partir de su file_path."
+        return f"https://api.telegram.org/file/bot{CentralConfig.TELEGRAM_TOKEN}/{file_path}"
+
     def send_message(self, chat_id: int, text: str) -> Tuple[bool, Optional[str]]:
         " Envía un mensaje de texto a un chat de Telegram."
         token = CentralConfig.TELEGRAM_TOKEN
@@ -52,12 +91,20 @@ class TelegramService:
             return False, f"Error enviando mensaje: {e}"
 
     @staticmethod
-    def configure_webhook(url: str) -> Tuple[bool, Optional[str]]:
+    def configure_webhook(url: str,
+                          max_connections: Optional[int] = None,
+                          allowed_updates: Optional[List[str]] = None,
+                          drop_pending_updates: bool = False,
+                          secret_token: Optional[str] = None) -> Tuple[bool, Optional[str]]:
         """
         Configura el webhook de Telegram.
         
         Args:
             url: URL pública para el webhook
+            max_connections: Conexiones simultáneas máximas para entregar updates (1-100)
+            allowed_updates: Tipos de update a recibir
+            drop_pending_updates: Descarta los updates pendientes al configurar
+            secret_token: Secreto enviado por Telegram en X-Telegram-Bot-Api-Secret-Token
             
         Returns:
             Tuple[bool, Optional[str]]: (éxito, mensaje_error)
@@ -67,10 +114,17 @@ class TelegramService:
             return False, error_msg
 
         token = CentralConfig.TELEGRAM_TOKEN
-        set_webhook_url = f"https://api.telegram.org/bot{token}/setWebhook?url={url}"
+        set_webhook_url = f"https://api.telegram.org/bot{token}/setWebhook"
+        payload = {"url": url, "drop_pending_updates": drop_pending_updates}
+        if max_connections:
+            payload["max_connections"] = max_connections
+        if allowed_updates is not None:
+            payload["allowed_updates"] = list(allowed_updates)
+        if secret_token:
+            payload["secret_token"] = secret_token
 
         try:
-            response = requests.get(set_webhook_url, timeout=10)
+            response = requests.post(set_webhook_url, json=payload, timeout=10)
             response.raise_for_status()
             return True, None
         except requests.exceptions.RequestException as e:
@@ -0,0 +1,255 @@
+"""
+Path: src/services/update_journal.py
+Journal append-only en disco para los updates aceptados.
+------------------------------------------------------------------------------
+- Cada update aceptado se escribe como un registro 'A' antes de procesarse y
+  solo se confirma cuando el registro está en disco (fsync agrupado: un único
+  fsync cubre a todos los hilos que esperan en ese momento).
+- Cuando la respuesta fue enviada se escribe un registro 'C' de finalización.
+- Al superar el tamaño máximo se rota el segmento activo y se compactan los
+  anteriores: las entradas pendientes se reescriben en el segmento nuevo y los
+  segmentos viejos se eliminan.
+- Al iniciar, los segmentos se leen mediante mmap y las entradas sin registro
+  'C' quedan disponibles para reprocesarse (recovered_entries); las que se
+  acepten después no forman parte de esa recuperación.
+- Un update_id que ya está pendiente no se registra de nuevo: un reenvío de
+  Telegram reutiliza la misma entrada.
+------------------------------------------------------------------------------
+"""
+
+import os
+import json
+import mmap
+import threading
+from typing import Any, Dict, List, Tuple
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+
+
+class UpdateJournal:
+    " Journal de escritura anticipada (write-ahead) para updates de Telegram "
+    def __init__(self, directory: str, segment_max_bytes: int = 4 * 1024 * 1024, logger=None):
+        self.logger = logger
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._flushed = threading.Condition(self._lock)
+        self._buffer: List[bytes] = []
+        self._appended_seq = 0
+        self._durable_seq = 0
+        self._flushing = False
+        self._pending: Dict[int, bytes] = {}
+        self._pending_by_update: Dict[Any, int] = {}  # update_id -> id de entrada
+        self._entry_updates: Dict[int, Any] = {}  # id de entrada -> update_id
+        self._recovered_ids: List[int] = []
+        self._next_id = 1
+        self._segment_index = 0
+        self._file = None
+        self._recover()
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def append(self, update: Dict[str, Any]) -> int:
+        """
+        Registra un update aceptado y retorna su id cuando ya es durable en disco.
+        Si el update_id ya está pendiente, retorna la entrada existente.
+        """
+        update_id = update.get("update_id")
+        with self._lock:
+            existing = self._pending_by_update.get(update_id) if update_id is not None else None
+            if existing is not None:
+                seq = self._appended_seq
+        if existing is not None:
+            # La entrada pudo haberse registrado recién en otro hilo: se espera su fsync.
+            self._sync(seq)
+            return existing
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            record = self._encode({"t": "A", "id": entry_id, "u": update})
+            self._pending[entry_id] = record
+            if update_id is not None:
+                self._pending_by_update[update_id] = entry_id
+                self._entry_updates[entry_id] = update_id
+            self._buffer.append(record)
+            self._appended_seq += 1
+            seq = self._appended_seq
+        self._sync(seq)
+        return entry_id
+
+    def complete(self, entry_id: int) -> None:
+        " Marca una entrada como finalizada; se escribe sin esperar fsync "
+        with self._lock:
+            if self._pending.pop(entry_id, None) is None:
+                return
+            update_id = self._entry_updates.pop(entry_id, None)
+            if update_id is not None:
+                self._pending_by_update.pop(update_id, None)
+            self._buffer.append(self._encode({"t": "C", "id": entry_id}))
+            self._appended_seq += 1
+            if not self._flushing:
+                self._write_buffer_locked()
+                self._maybe_rotate_locked()
+
+    def recovered_entries(self) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Retorna las entradas recuperadas al iniciar que siguen sin finalizar, ordenadas
+        por id. Excluye los updates aceptados después del arranque.
+        """
+        with self._lock:
+            pending = [(i, self._pending[i]) for i in self._recovered_ids if i in self._pending]
+        return [(entry_id, json.loads(record)["u"]) for entry_id, record in pending]
+
+    def is_pending(self, entry_id: int) -> bool:
+        " Indica si la entrada sigue sin finalizar "
+        with self._lock:
+            return entry_id in self._pending
+
+    def pending_entries(self) -> List[Tuple[int, Dict[str, Any]]]:
+        " Retorna las entradas aceptadas sin finalizar, ordenadas por id "
+        with self._lock:
+            pending = sorted(self._pending.items())
+        return [(entry_id, json.loads(record)["u"]) for entry_id, record in pending]
+
+    def close(self) -> None:
+        " Vuelca el buffer pendiente y cierra el segmento activo "
+        with self._lock:
+            while self._flushing:
+                self._flushed.wait()
+            self._write_buffer_locked()
+            if self._file:
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    # ------------------------------------------------------------------
+    # Escritura con fsync agrupado
+    # ------------------------------------------------------------------
+    def _sync(self, seq: int) -> None:
+        with self._lock:
+            while self._durable_seq < seq:
+                if self._flushing:
+                    self._flushed.wait()
+                    continue
+                self._flushing = True
+                batch, self._buffer = self._buffer, []
+                target = self._appended_seq
+                self._lock.release()
+                try:
+                    if batch:
+                        self._file.write(b"".join(batch))
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                finally:
+                    self._lock.acquire()
+                    self._flushing = False
+                    self._flushed.notify_all()
+                self._durable_seq = max(self._durable_seq, target)
+                self._write_buffer_locked()
+                self._maybe_rotate_locked()
+
+    def _write_buffer_locked(self) -> None:
+        if self._buffer:
+            self._file.write(b"".join(self._buffer))
+            self._file.flush()
+            self._buffer = []
+
+    @staticmethod
+    def _encode(record: Dict[str, Any]) -> bytes:
+        encoded = json.dumps(record, separators=(",", ":"), ensure_ascii=False)
+        return encoded.encode("utf-8") + b"\n"
+
+    # ------------------------------------------------------------------
+    # Segmentos: rotación, compactación y recuperación
+    # ------------------------------------------------------------------
+    def _segment_path(self, index: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{index:08d}{SEGMENT_SUFFIX}")
+
+    def _segment_indexes(self) -> List[int]:
+        indexes = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                try:
+                    indexes.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+                except ValueError:
+                    continue
+        return sorted(indexes)
+
+    def _maybe_rotate_locked(self) -> None:
+        if self._flushing or self._file.tell() < self.segment_max_bytes:
+            return
+        self._open_new_segment_locked()
+
+    def _open_new_segment_locked(self) -> None:
+        "Abre un segmento nuevo, reescribe en él las entradas pendientes y borra los anteriores."
+        if self._file:
+            os.fsync(self._file.fileno())
+            self._file.close()
+        old_indexes = [i for i in self._segment_indexes() if i <= self._segment_index]
+        self._segment_index += 1
+        self._file = open(self._segment_path(self._segment_index), "ab")
+        if self._pending:
+            self._file.write(b"".join(record for _, record in sorted(self._pending.items())))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        for index in old_indexes:
+            os.remove(self._segment_path(index))
+        if self.logger:
+            self.logger.debug("[UpdateJournal] Segmento %d activo, %d entradas pendientes",
+                              self._segment_index, len(self._pending))
+
+    def _recover(self) -> None:
+        "Lee los segmentos existentes con mmap y reconstruye las entradas pendientes."
+        accepted: Dict[int, bytes] = {}
+        update_ids: Dict[int, Any] = {}
+        completed = set()
+        indexes = self._segment_indexes()
+        for index in indexes:
+            for record in self._read_segment(self._segment_path(index)):
+                try:
+                    data = json.loads(record)
+                    entry_id = int(data["id"])
+                except (ValueError, KeyError, TypeError):
+                    # Registro truncado por una caída a mitad de escritura.
+                    continue
+                if data.get("t") == "A":
+                    accepted[entry_id] = record + b"\n"
+                    update_ids[entry_id] = (data.get("u") or {}).get("update_id")
+                elif data.get("t") == "C":
+                    completed.add(entry_id)
+                self._next_id = max(self._next_id, entry_id + 1)
+        self._pending = {i: r for i, r in accepted.items() if i not in completed}
+        self._recovered_ids = sorted(self._pending)
+        self._entry_updates = {
+            i: update_ids[i] for i in self._recovered_ids if update_ids[i] is not None
+        }
+        self._pending_by_update = {
+            update_id: i for i, update_id in self._entry_updates.items()
+        }
+        self._segment_index = indexes[-1] if indexes else 0
+        with self._lock:
+            self._open_new_segment_locked()
+        if self.logger and self._pending:
+            self.logger.warning("[UpdateJournal] %d updates sin finalizar recuperados",
+                                len(self._pending))
+
+    @staticmethod
+    def _read_segment(path: str) -> List[bytes]:
+        if os.path.getsize(path) == 0:
+            return []
+        records = []
+        with open(path, "rb") as segment, \
+                mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            position = 0
+            size = len(mapped)
+            while position < size:
+                end = mapped.find(b"\n", position)
+                if end == -1:
+                    break
+                records.append(mapped[position:end])
+                position = end + 1
+        return records
+
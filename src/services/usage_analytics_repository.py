@@ -0,0 +1,174 @@
+"""
+Path: src/services/usage_analytics_repository.py
+Repositorio de las tablas de rollup de uso (por chat y por curso, por día).
+Las consultas son búsquedas por clave primaria, por lo que su costo no depende
+del tamaño del historial.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+from src.services.database_connection_manager import DatabaseConnectionManager
+from src.utils.latency_sketch import LatencySketch
+
+ChatKey = Tuple[str, str, int]  # (día ISO, curso, chat_id)
+
+
+class UsageAnalyticsRepository:
+    " Repositorio para las tablas usage_chat_daily y usage_course_daily "
+    def __init__(self, connection_manager: DatabaseConnectionManager, logger=None):
+        self.connection_manager = connection_manager
+        self.logger = logger
+
+    def initialize_tables(self):
+        " Crea las tablas de rollup si no existen "
+        with self.connection_manager.get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS usage_chat_daily (
+                        day DATE NOT NULL,
+                        course VARCHAR(128) NOT NULL,
+                        chat_id BIGINT NOT NULL,
+                        messages INT NOT NULL DEFAULT 0,
+                        tokens BIGINT NOT NULL DEFAULT 0,
+                        latency_sketch TEXT NOT NULL,
+                        PRIMARY KEY (day, course, chat_id)
+                    );
+                """)
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS usage_course_daily (
+                        day DATE NOT NULL,
+                        course VARCHAR(128) NOT NULL,
+                        messages INT NOT NULL DEFAULT 0,
+                        tokens BIGINT NOT NULL DEFAULT 0,
+                        active_chats INT NOT NULL DEFAULT 0,
+                        latency_sketch TEXT NOT NULL,
+                        PRIMARY KEY (day, course)
+                    );
+                """)
+                connection.commit()
+                self.logger.debug("Tablas de analítica de uso verificadas/creadas.")
+
+    def apply_batch(self, batch: Dict[ChatKey, Dict[str, Any]]) -> None:
+        """
+        Aplica un lote de deltas por (día, curso, chat) en una sola transacción.
+        Cada delta tiene las claves messages, tokens y sketch (LatencySketch).
+        """
+        if not batch:
+            return
+        chat_keys = list(batch)
+        with self.connection_manager.get_connection() as connection:
+            with connection.cursor() as cursor:
+                existing = self._lock_rows(
+                    cursor, "usage_chat_daily", ("day", "course", "chat_id"), chat_keys
+                )
+                chat_rows = []
+                course_deltas: Dict[Tuple[str, str], Dict[str, Any]] = {}
+                for key, delta in batch.items():
+                    sketch = LatencySketch.from_json(existing.get(key)).merge(delta["sketch"])
+                    chat_rows.append((*key, delta["messages"], delta["tokens"], sketch.to_json()))
+                    course = course_deltas.setdefault(
+                        key[:2], {"messages": 0, "tokens": 0, "new_chats": 0,
+                                  "sketch": LatencySketch()}
+                    )
+                    course["messages"] += delta["messages"]
+                    course["tokens"] += delta["tokens"]
+                    course["new_chats"] += 0 if key in existing else 1
+                    course["sketch"].merge(delta["sketch"])
+                cursor.executemany("""
+                    INSERT INTO usage_chat_daily
+                        (day, course, chat_id, messages, tokens, latency_sketch)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        messages = messages + VALUES(messages),
+                        tokens = tokens + VALUES(tokens),
+                        latency_sketch = VALUES(latency_sketch);
+                """, chat_rows)
+
+                existing_courses = self._lock_rows(
+                    cursor, "usage_course_daily", ("day", "course"), list(course_deltas)
+                )
+                course_rows = []
+                for key, delta in course_deltas.items():
+                    sketch = LatencySketch.from_json(existing_courses.get(key))
+                    sketch.merge(delta["sketch"])
+                    course_rows.append((*key, delta["messages"], delta["tokens"],
+                                        delta["new_chats"], sketch.to_json()))
+                cursor.executemany("""
+                    INSERT INTO usage_course_daily
+                        (day, course, messages, tokens, active_chats, latency_sketch)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        messages = messages + VALUES(messages),
+                        tokens = tokens + VALUES(tokens),
+                        active_chats = active_chats + VALUES(active_chats),
+                        latency_sketch = VALUES(latency_sketch);
+                """, course_rows)
+                connection.commit()
+
+    @staticmethod
+    def _lock_rows(cursor, table: str, columns: Tuple[str, ...],
+                   keys: List[Tuple]) -> Dict[Tuple, str]:
+        "Bloquea (FOR UPDATE) las filas existentes de las claves y retorna sus sketches."
+        row_placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        cursor.execute(
+            f"SELECT {', '.join(columns)}, latency_sketch FROM {table} "
+            f"WHERE ({', '.join(columns)}) IN ({', '.join([row_placeholder] * len(keys))}) "
+            "FOR UPDATE;",
+            [value for key in keys for value in key]
+        )
+        return {
+            (str(row[0]), *row[1:len(columns)]): row[len(columns)]
+            for row in cursor.fetchall()
+        }
+
+    def get_course_day(self, day: str, course: str) -> Optional[Dict[str, Any]]:
+        " Retorna el resumen de un curso en un día, incluyendo percentiles de latencia "
+        with self.connection_manager.get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT messages, tokens, active_chats, latency_sketch "
+                    "FROM usage_course_daily WHERE day = %s AND course = %s;",
+                    (day, course)
+                )
+                row = cursor.fetchone()
+        if not row:
+            return None
+        return self._summary({"day": day, "course": course, "messages": row[0],
+                              "tokens": row[1], "active_chats": row[2]}, row[3])
+
+    def get_courses_for_day(self, day: str) -> List[Dict[str, Any]]:
+        " Retorna el resumen de todos los cursos de un día "
+        with self.connection_manager.get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT course, messages, tokens, active_chats, latency_sketch "
+                    "FROM usage_course_daily WHERE day = %s ORDER BY course;",
+                    (day,)
+                )
+                rows = cursor.fetchall()
+        return [
+            self._summary({"day": day, "course": row[0], "messages": row[1],
+                           "tokens": row[2], "active_chats": row[3]}, row[4])
+            for row in rows
+        ]
+
+    def get_top_chats(self, day: str, course: str, limit: int = 20) -> List[Dict[str, Any]]:
+        " Retorna los chats con más mensajes de un curso en un día "
+        with self.connection_manager.get_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT chat_id, messages, tokens, latency_sketch FROM usage_chat_daily "
+                    "WHERE day = %s AND course = %s ORDER BY messages DESC LIMIT %s;",
+                    (day, course, limit)
+                )
+                rows = cursor.fetchall()
+        return [
+            self._summary({"chat_id": row[0], "messages": row[1], "tokens": row[2]}, row[3])
+            for row in rows
+        ]
+
+    @staticmethod
+    def _summary(values: Dict[str, Any], raw_sketch: str) -> Dict[str, Any]:
+        sketch = LatencySketch.from_json(raw_sketch)
+        values["latency_p50_ms"] = sketch.quantile(0.5)
+        values["latency_p95_ms"] = sketch.quantile(0.95)
+        return values
@@ -0,0 +1,130 @@
+"""
+Path: src/services/usage_analytics_service.py
+Mantiene los rollups de uso de forma incremental: cada update procesado se acumula
+en memoria y los deltas se aplican en lotes (upserts agrupados) sobre las tablas
+de rollup, sin reescanear el historial de mensajes.
+"""
+
+import json
+import threading
+from datetime import date
+from typing import Any, Dict, Optional
+from src.services.usage_analytics_repository import UsageAnalyticsRepository, ChatKey
+from src.utils.latency_sketch import LatencySketch
+
+PRIVATE_COURSE = "privado"
+
+
+class UsageAnalyticsService:
+    " Acumula métricas de uso por chat y por día y las vuelca en lotes al repositorio "
+    def __init__(self,
+                 repository: UsageAnalyticsRepository,
+                 logger=None,
+                 batch_size: int = 200,
+                 flush_interval: float = 10.0,
+                 courses: Optional[Dict[str, str]] = None):
+        self.repository = repository
+        self.logger = logger
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.courses = {str(chat_id): course for chat_id, course in (courses or {}).items()}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._buffer: Dict[ChatKey, Dict[str, Any]] = {}
+        self._buffered_updates = 0
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def load_courses(raw: Optional[str]) -> Dict[str, str]:
+        " Interpreta el mapeo chat_id -> curso configurado como JSON; vacío si no es válido "
+        if not raw:
+            return {}
+        try:
+            courses = json.loads(raw)
+        except ValueError:
+            return {}
+        return courses if isinstance(courses, dict) else {}
+
+    def course_for(self, chat: Dict[str, Any]) -> str:
+        " Determina el curso de un chat: mapeo configurado, título del grupo o 'privado' "
+        course = self.courses.get(str(chat.get("id")))
+        if course:
+            return course
+        if chat.get("type") in ("group", "supergroup") and chat.get("title"):
+            return chat["title"][:128]
+        return PRIVATE_COURSE
+
+    def record(self,
+               chat: Dict[str, Any],
+               latency_seconds: float,
+               tokens: int,
+               day: Optional[date] = None) -> None:
+        " Registra un update procesado; dispara un volcado al completar un lote "
+        key = ((day or date.today()).isoformat(), self.course_for(chat), int(chat["id"]))
+        with self._lock:
+            delta = self._buffer.get(key)
+            if delta is None:
+                delta = {"messages": 0, "tokens": 0, "sketch": LatencySketch()}
+                self._buffer[key] = delta
+            delta["messages"] += 1
+            delta["tokens"] += tokens
+            delta["sketch"].add(latency_seconds * 1000)
+            self._buffered_updates += 1
+            should_flush = self._buffered_updates >= self.batch_size
+        if should_flush:
+            if self._thread is not None:
+                self._wake.set()
+            else:
+                self.flush()
+
+    def flush(self) -> int:
+        " Aplica los deltas acumulados; si falla, los reincorpora al buffer para reintentar "
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, {}
+                self._buffered_updates = 0
+            if not batch:
+                return 0
+            try:
+                self.repository.apply_batch(batch)
+            except Exception as e:  # pylint: disable=broad-except
+                self.logger.error("[UsageAnalytics] Error aplicando lote de analítica: %s", e)
+                self._restore(batch)
+                return 0
+            self.logger.debug("[UsageAnalytics] Lote aplicado: %d claves", len(batch))
+            return len(batch)
+
+    def _restore(self, batch: Dict[ChatKey, Dict[str, Any]]) -> None:
+        with self._lock:
+            for key, delta in batch.items():
+                current = self._buffer.get(key)
+                if current is None:
+                    self._buffer[key] = delta
+                    continue
+                current["messages"] += delta["messages"]
+                current["tokens"] += delta["tokens"]
+                current["sketch"].merge(delta["sketch"])
+            self._buffered_updates += sum(delta["messages"] for delta in batch.values())
+
+    def start(self) -> None:
+        " Inicia el hilo que vuelca el buffer cada flush_interval segundos "
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        " Detiene el hilo de volcado y aplica lo pendiente "
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
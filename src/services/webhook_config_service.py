@@ -3,6 +3,7 @@ Path: src/services/webhook_config_service.py
 """
 
 import requests
+from src.configuration.central_config import CentralConfig
 from src.services.telegram_service import TelegramService
 
 class WebhookConfigService:
@@ -10,6 +11,10 @@ class WebhookConfigService:
     def __init__(self, telegram_service: TelegramService, logger=None):
         self.logger = logger
         self.telegram_service = telegram_service
+        self.max_connections = CentralConfig.WEBHOOK_MAX_CONNECTIONS
+        self.allowed_updates = CentralConfig.WEBHOOK_ALLOWED_UPDATES
+        self.drop_pending_updates = CentralConfig.WEBHOOK_DROP_PENDING_UPDATES
+        self.secret_token = CentralConfig.WEBHOOK_SECRET_TOKEN
 
     def run_configuration(self):
         "Ejecuta el flujo de configuración del webhook."
@@ -56,16 +61,34 @@ class WebhookConfigService:
         return None
 
     def verify_webhook(self, public_url):
-        "Verifica si el webhook ya está configurado con la URL proporcionada"
+        """
+        Verifica si el webhook ya está configurado con la URL y los parámetros deseados
+        (max_connections y allowed_updates). getWebhookInfo no expone el secret_token ni
+        drop_pending_updates, por lo que si hay un secreto configurado se reconfigura siempre.
+        """
         desired_webhook_url = self._desired_webhook_url(public_url)
         success, info = self.telegram_service.get_webhook_info()
-        if success and info.get("result", {}).get("url", "") == desired_webhook_url:
-            self.logger.info(
-                "El webhook ya está configurado correctamente en: %s", 
-                desired_webhook_url
-            )
-            return True
-        return False
+        if not success:
+            return False
+        result = info.get("result", {})
+        mismatches = []
+        if result.get("url", "") != desired_webhook_url:
+            mismatches.append("url")
+        if self.max_connections and result.get("max_connections") != self.max_connections:
+            mismatches.append("max_connections")
+        # Telegram omite allowed_updates cuando se reciben todos los tipos salvo los opcionales.
+        if sorted(result.get("allowed_updates") or []) != sorted(self.allowed_updates or []):
+            mismatches.append("allowed_updates")
+        if self.secret_token:
+            mismatches.append("secret_token")
+        if mismatches:
+            self.logger.debug("El webhook difiere en: %s", ", ".join(mismatches))
+            return False
+        self.logger.info(
+            "El webhook ya está configurado correctamente en: %s", 
+            desired_webhook_url
+        )
+        return True
 
     def _desired_webhook_url(self, public_url: str) -> str:
         "Construye la URL deseada para el webhook a partir de la URL pública."
@@ -75,7 +98,13 @@ class WebhookConfigService:
         "Configura el webhook con la URL proporcionada"
         desired_webhook_url = self._desired_webhook_url(public_url)
         self.logger.debug("Configurando webhook con la URL: %s", desired_webhook_url)
-        success, error = self.telegram_service.configure_webhook(desired_webhook_url)
+        success, error = self.telegram_service.configure_webhook(
+            desired_webhook_url,
+            max_connections=self.max_connections,
+            allowed_updates=self.allowed_updates,
+            drop_pending_updates=self.drop_pending_updates,
+            secret_token=self.secret_token
+        )
         if success:
             self.logger.info("Webhook configurado correctamente en: %s", desired_webhook_url)
             return True
@@ -0,0 +1,77 @@
+"""
+Path: src/utils/latency_sketch.py
+Sketch de cuantiles combinable (estilo DDSketch) para latencias.
+Garantiza un error relativo acotado por relative_accuracy en cada cuantil y dos
+sketches se combinan sumando los conteos de sus buckets, por lo que los rollups
+diarios pueden actualizarse de forma incremental.
+"""
+
+import json
+import math
+from typing import Dict, Optional
+
+DEFAULT_RELATIVE_ACCURACY = 0.02
+
+
+class LatencySketch:
+    " Histograma logarítmico combinable para estimar percentiles de latencia (en ms) "
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float, count: int = 1) -> None:
+        " Agrega una observación "
+        if value <= 0:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+
+    def merge(self, other: "LatencySketch") -> "LatencySketch":
+        " Combina otro sketch con la misma precisión en este "
+        if not math.isclose(other.gamma, self.gamma):
+            raise ValueError("No se pueden combinar sketches con distinta precisión")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        " Retorna el cuantil q (0..1) estimado, o None si el sketch está vacío "
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def to_json(self) -> str:
+        " Serializa el sketch para persistirlo "
+        return json.dumps({
+            "a": self.relative_accuracy,
+            "z": self.zero_count,
+            "b": {str(index): count for index, count in self.buckets.items()},
+        }, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, raw: Optional[str]) -> "LatencySketch":
+        " Reconstruye un sketch serializado; retorna uno vacío si raw está vacío "
+        if not raw:
+            return cls()
+        data = json.loads(raw)
+        sketch = cls(data.get("a", DEFAULT_RELATIVE_ACCURACY))
+        sketch.zero_count = data.get("z", 0)
+        sketch.buckets = {int(index): count for index, count in data.get("b", {}).items()}
+        sketch.count = sketch.zero_count + sum(sketch.buckets.values())
+        return sketch
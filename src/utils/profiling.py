@@ -0,0 +1,201 @@
+"""
+Path: src/utils/profiling.py
+Perfilado bajo demanda y registro de updates lentos.
+------------------------------------------------------------------------------
+- UpdateProfiler.arm() activa un perfilador por muestreo para los próximos N
+  updates o para un porcentaje del tráfico. Cada update perfilado genera un
+  archivo .folded (stacks colapsados "a;b;c N"), listo para flamegraph.pl o
+  speedscope.
+- Con slow_threshold_seconds > 0, cada update se mide por etapas (stage) y los
+  que superan el umbral se registran con su desglose y entradas en
+  slow_updates.jsonl.
+- stage() consulta una variable thread-local: si no hay traza activa en el hilo
+  retorna un contexto nulo compartido, por lo que el costo sin perfilado es
+  prácticamente nulo.
+------------------------------------------------------------------------------
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import threading
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional
+
+_NULL_CONTEXT = nullcontext()
+_current = threading.local()
+
+
+class _StageTimer:
+    " Acumula la duración de una etapa en la traza activa "
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace: "UpdateTrace", name: str):
+        self.trace = trace
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        self.trace.stages[self.name] = self.trace.stages.get(self.name, 0.0) + elapsed
+        return False
+
+
+class UpdateTrace:
+    " Desglose por etapas e información de entrada de un update "
+    def __init__(self, update: Dict[str, Any]):
+        self.update = update
+        self.stages: Dict[str, float] = {}
+        self.start = time.perf_counter()
+        self.total = 0.0
+
+
+def stage(name: str):
+    " Mide una etapa del update en curso; no hace nada si el hilo no tiene traza activa "
+    trace = getattr(_current, "trace", None)
+    if trace is None:
+        return _NULL_CONTEXT
+    return _StageTimer(trace, name)
+
+
+class SamplingProfiler:
+    " Perfilador por muestreo de un hilo mediante sys._current_frames() "
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        " Inicia el muestreo "
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        " Detiene el muestreo y retorna los stacks colapsados con su cantidad de muestras "
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)  # pylint: disable=protected-access
+            frames: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join(reversed(frames))] += 1
+
+
+class UpdateProfiler:
+    " Punto de control del perfilado por update y del registro de updates lentos "
+    def __init__(self,
+                 output_dir: str,
+                 slow_threshold_seconds: float = 0.0,
+                 sample_interval: float = 0.005,
+                 logger=None):
+        self.output_dir = output_dir
+        self.slow_threshold_seconds = slow_threshold_seconds
+        self.sample_interval = sample_interval
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._remaining = 0
+        self._percent = 0.0
+        self.enabled = slow_threshold_seconds > 0
+
+    def arm(self, updates: int = 0, percent: float = 0.0) -> Dict[str, Any]:
+        " Activa el perfilado para los próximos N updates y/o un porcentaje del tráfico "
+        with self._lock:
+            self._remaining = max(0, int(updates))
+            self._percent = min(100.0, max(0.0, float(percent)))
+            self._refresh_enabled_locked()
+        if self.logger:
+            self.logger.info("[UpdateProfiler] Perfilado activado: updates=%d, porcentaje=%.1f",
+                             self._remaining, self._percent)
+        return self.status()
+
+    def disarm(self) -> Dict[str, Any]:
+        " Desactiva el perfilado por muestreo "
+        return self.arm(0, 0.0)
+
+    def status(self) -> Dict[str, Any]:
+        " Retorna el estado actual y los perfiles disponibles "
+        dumps = []
+        if os.path.isdir(self.output_dir):
+            dumps = sorted(n for n in os.listdir(self.output_dir) if n.endswith(".folded"))
+        return {
+            "enabled": self.enabled,
+            "remaining_updates": self._remaining,
+            "percent": self._percent,
+            "slow_threshold_seconds": self.slow_threshold_seconds,
+            "dumps": dumps,
+        }
+
+    def _refresh_enabled_locked(self) -> None:
+        self.enabled = bool(self._remaining or self._percent or self.slow_threshold_seconds > 0)
+
+    def _should_sample(self) -> bool:
+        with self._lock:
+            if self._remaining:
+                self._remaining -= 1
+                self._refresh_enabled_locked()
+                return True
+            return bool(self._percent) and random.random() * 100 < self._percent
+
+    @contextmanager
+    def trace(self, update: Dict[str, Any]) -> Iterator[UpdateTrace]:
+        " Mide el update en el hilo actual y, si corresponde, lo perfila por muestreo "
+        current = UpdateTrace(update)
+        sampler = None
+        if self._should_sample():
+            sampler = SamplingProfiler(threading.get_ident(), self.sample_interval)
+            sampler.start()
+        _current.trace = current
+        try:
+            yield current
+        finally:
+            _current.trace = None
+            current.total = time.perf_counter() - current.start
+            if sampler is not None:
+                self._dump_stacks(update, sampler.stop())
+            if 0 < self.slow_threshold_seconds <= current.total:
+                self._log_slow_update(current)
+
+    def _dump_stacks(self, update: Dict[str, Any], stacks: Counter) -> Optional[str]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{update.get('update_id', 'na')}.folded"
+        path = os.path.join(self.output_dir, name)
+        with open(path, "w", encoding="utf-8") as output:
+            for collapsed, samples in stacks.most_common():
+                output.write(f"{collapsed} {samples}\n")
+        if self.logger:
+            self.logger.info("[UpdateProfiler] Perfil guardado en %s (%d muestras)",
+                             path, sum(stacks.values()))
+        return path
+
+    def _log_slow_update(self, current: UpdateTrace) -> None:
+        message = current.update.get("message") or {}
+        record = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "update_id": current.update.get("update_id"),
+            "chat_id": (message.get("chat") or {}).get("id"),
+            "total_seconds": round(current.total, 4),
+            "stages": {name: round(seconds, 4) for name, seconds in current.stages.items()},
+            "text": (message.get("text") or message.get("caption") or "")[:500],
+        }
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, "slow_updates.jsonl"), "a",
+                  encoding="utf-8") as output:
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if self.logger:
+            self.logger.warning("[UpdateProfiler] Update lento (%.2fs): %s",
+                                current.total, record["stages"])
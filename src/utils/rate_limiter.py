@@ -0,0 +1,37 @@
+"""
+Path: src/utils/rate_limiter.py
+Limitador de tasa tipo token bucket, seguro entre hilos.
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    " Permite hasta rate operaciones por segundo con ráfagas de hasta burst "
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        " Bloquea hasta que haya un token disponible "
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        " Suspende la entrega de tokens (por ejemplo, ante un 429 con retry_after) "
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
@@ -0,0 +1,45 @@
+"""
+Path: src/utils/update_filter.py
+Rechazo temprano de tráfico del webhook, antes de cualquier parseo JSON o pydantic.
+"""
+
+import hmac
+import re
+from typing import Callable, Collection, Optional
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+# Telegram serializa el update con update_id primero y luego el campo del tipo de
+# update ("message", "edited_message", "callback_query", ...).
+_UPDATE_TYPE_PATTERN = re.compile(rb'\A\s*\{\s*"update_id"\s*:\s*-?\d+\s*,\s*"([a-z_]+)"')
+_PEEK_BYTES = 128
+
+FORBIDDEN = "forbidden"
+IGNORED = "ignored"
+
+
+def peek_update_type(raw_body: bytes) -> Optional[str]:
+    " Retorna el tipo de update leyendo solo el inicio del body, o None si no se reconoce "
+    match = _UPDATE_TYPE_PATTERN.match(raw_body[:_PEEK_BYTES])
+    return match.group(1).decode("ascii") if match else None
+
+
+def early_reject(secret_header: Optional[str],
+                 read_body: Callable[[], bytes],
+                 secret_token: Optional[str],
+                 allowed_updates: Optional[Collection[str]]) -> Optional[str]:
+    """
+    Retorna FORBIDDEN si el header secreto no coincide, IGNORED si el tipo de update
+    no está permitido, o None si el update debe procesarse. Si el tipo no puede
+    determinarse sin parsear, el update se deja pasar.
+    read_body se invoca solo si el secreto es válido y hay tipos permitidos que
+    verificar, de modo que el tráfico con secreto inválido no se lee.
+    """
+    if secret_token and not hmac.compare_digest(
+            (secret_header or "").encode("utf-8"), secret_token.encode("utf-8")):
+        return FORBIDDEN
+    if allowed_updates:
+        update_type = peek_update_type(read_body())
+        if update_type is not None and update_type not in allowed_updates:
+            return IGNORED
+    return None
@@ -2,7 +2,9 @@
 Path: src/views/app_view.py
 """
 
-from flask import Blueprint, request, jsonify, current_app
+import hmac
+from flask import Blueprint, request, jsonify, current_app, send_from_directory
+from src.utils.update_filter import early_reject, SECRET_TOKEN_HEADER, FORBIDDEN
 
 blueprint = Blueprint('app', __name__)
 
@@ -15,6 +17,19 @@ def index():
 def webhook():
     "Endpoint para recibir actualizaciones de Telegram, integrando el flujo unificado del webhook."
     logger = current_app.config.get("logger")
+    # Rechazo temprano: primero el header secreto (sin leer el body) y luego el tipo de
+    # update sobre el body crudo, antes de parsear JSON.
+    rejection = early_reject(
+        request.headers.get(SECRET_TOKEN_HEADER),
+        lambda: request.get_data(cache=True),
+        current_app.config.get("webhook_secret_token"),
+        current_app.config.get("allowed_updates")
+    )
+    if rejection == FORBIDDEN:
+        return "", 403
+    if rejection:
+        return jsonify({"status": "ok", "response": None})
+
     update = request.get_json()
     logger.debug("webhook - Received update: %s", update)
 
@@ -23,9 +38,132 @@ def webhook():
         logger.error("Controlador no encontrado en la configuración de la aplicación")
         return jsonify({"status": "error", "detail": "Controlador no configurado"}), 500
 
+    if controller.lanes:
+        lane = controller.submit_update(update)
+        return jsonify({"status": "ok", "lane": lane})
+
     response = controller.process_update(update)
+    if not controller.last_update_handled():
+        # Un error 5xx hace que Telegram reenvíe el update.
+        return jsonify({"status": "error", "detail": "Update no procesado"}), 500
     return jsonify({"status": "ok", "response": response})
 
+def _admin_authorized() -> bool:
+    "Verifica el header X-Admin-Token contra el token de administración configurado."
+    admin_token = current_app.config.get("admin_token")
+    provided = request.headers.get("X-Admin-Token", "")
+    return bool(admin_token) and hmac.compare_digest(provided, admin_token)
+
+def _get_profiler():
+    controller = current_app.config.get("controller")
+    return getattr(controller, "profiler", None)
+
+@blueprint.route("/admin/profiling", methods=["GET", "POST", "DELETE"])
+def admin_profiling():
+    """
+    Administra el perfilado bajo demanda.
+    GET retorna el estado, POST {"updates": N, "percent": P} lo activa y DELETE lo desactiva.
+    """
+    if not _admin_authorized():
+        return jsonify({"status": "error", "detail": "No autorizado"}), 403
+    profiler = _get_profiler()
+    if not profiler:
+        return jsonify({"status": "error", "detail": "Perfilado no configurado"}), 404
+    if request.method == "POST":
+        body = request.get_json(silent=True) or {}
+        try:
+            status = profiler.arm(body.get("updates", 0), body.get("percent", 0.0))
+        except (TypeError, ValueError):
+            return jsonify({"status": "error", "detail": "Parámetros inválidos"}), 400
+    elif request.method == "DELETE":
+        status = profiler.disarm()
+    else:
+        status = profiler.status()
+    return jsonify({"status": "ok", "profiling": status})
+
+@blueprint.route("/admin/profiling/dumps/<path:name>", methods=["GET"])
+def admin_profiling_dump(name):
+    "Descarga un perfil en formato de stacks colapsados (flamegraph)."
+    if not _admin_authorized():
+        return jsonify({"status": "error", "detail": "No autorizado"}), 403
+    profiler = _get_profiler()
+    if not profiler or not name.endswith((".folded", ".jsonl")):
+        return jsonify({"status": "error", "detail": "Perfil no encontrado"}), 404
+    return send_from_directory(profiler.output_dir, name, mimetype="text/plain")
+
+@blueprint.route("/admin/lanes", methods=["GET"])
+def admin_lanes():
+    "Retorna el estado y la latencia de cada carril de ejecución."
+    if not _admin_authorized():
+        return jsonify({"status": "error", "detail": "No autorizado"}), 403
+    controller = current_app.config.get("controller")
+    lanes = getattr(controller, "lanes", None)
+    if not lanes:
+        return jsonify({"status": "error", "detail": "Carriles no configurados"}), 404
+    return jsonify({"status": "ok", "lanes": lanes.status()})
+
+@blueprint.route("/admin/policies", methods=["GET"])
+def admin_policies():
+    "Retorna, por clase de política, la cantidad de respuestas y su latencia y tokens medios."
+    if not _admin_authorized():
+        return jsonify({"status": "error", "detail": "No autorizado"}), 403
+    controller = current_app.config.get("controller")
+    return jsonify({"status": "ok", "policies": controller.policy_stats.summary()})
+
+@blueprint.route("/admin/relevance", methods=["GET"])
+def admin_relevance():
+    "Retorna los contadores del filtro de relevancia de grupos (llamadas a Gemini evitadas)."
+    if not _admin_authorized():
+        return jsonify({"status": "error", "detail": "No autorizado"}), 403
+    controller = current_app.config.get("controller")
+    relevance_gate = getattr(controller, "relevance_gate", None)
+    if not relevance_gate:
+        return jsonify({"status": "error", "detail": "Filtro de relevancia no configurado"}), 404
+    return jsonify({"status": "ok", "relevance": relevance_gate.stats()})
+
+@blueprint.route("/admin/system-instructions/reload", methods=["POST"])
+def admin_reload_system_instructions():
+    "Relee las instrucciones del sistema de la BD; si cambiaron, invalida la caché de contexto."
+    if not _admin_authorized():
+        return jsonify({"status": "error", "detail": "No autorizado"}), 403
+    config_repository = current_app.config.get("config_repository")
+    if not config_repository:
+        return jsonify({"status": "error", "detail": "Configuración no disponible"}), 404
+    controller = current_app.config.get("controller")
+    changed = controller.gemini_service.update_system_instruction(
+        config_repository.get_system_instructions()
+    )
+    return jsonify({"status": "ok", "changed": changed})
+
+@blueprint.route("/admin/broadcast", methods=["POST"])
+def admin_broadcast():
+    """
+    Inicia una difusión masiva.
+    Body: {"text": "...", "audience": {"chat_types": ["private"], "active_since_days": 30}}
+    """
+    if not _admin_authorized():
+        return jsonify({"status": "error", "detail": "No autorizado"}), 403
+    broadcast_service = current_app.config.get("broadcast_service")
+    if not broadcast_service:
+        return jsonify({"status": "error", "detail": "Difusión no configurada"}), 404
+    body = request.get_json(silent=True) or {}
+    text = (body.get("text") or "").strip()
+    if not text:
+        return jsonify({"status": "error", "detail": "El campo 'text' es obligatorio"}), 400
+    broadcast_id = broadcast_service.start_broadcast(text, body.get("audience"))
+    return jsonify({"status": "ok", "broadcast_id": broadcast_id}), 202
+
+@blueprint.route("/admin/broadcast/<int:broadcast_id>", methods=["GET"])
+def admin_broadcast_status(broadcast_id):
+    "Retorna el progreso de una difusión (enviados, bloqueados, tasa y ETA)."
+    if not _admin_authorized():
+        return jsonify({"status": "error", "detail": "No autorizado"}), 403
+    broadcast_service = current_app.config.get("broadcast_service")
+    status = broadcast_service.get_status(broadcast_id) if broadcast_service else None
+    if not status:
+        return jsonify({"status": "error", "detail": "Difusión no encontrada"}), 404
+    return jsonify({"status": "ok", "broadcast": status})
+
 @blueprint.errorhandler(Exception)
 def handle_exception(e):
     "Manejador global de excepciones"
@@ -0,0 +1,234 @@
+"""
+Path: tests/test_usage_analytics.py
+Verifica que los rollups incrementales de uso (record -> flush -> apply_batch)
+coincidan con un recálculo completo sobre los eventos crudos.
+"""
+
+import logging
+import random
+import re
+from datetime import date, timedelta
+from typing import Any, Dict, List, Tuple
+import pytest
+from src.services.usage_analytics_repository import UsageAnalyticsRepository
+from src.services.usage_analytics_service import UsageAnalyticsService
+from src.utils.latency_sketch import LatencySketch
+
+LOGGER = logging.getLogger("test_usage_analytics")
+KEY_COLUMNS = {"usage_chat_daily": 3, "usage_course_daily": 2}
+
+
+class FakeCursor:
+    " Cursor en memoria que interpreta las consultas de UsageAnalyticsRepository "
+    def __init__(self, tables: Dict[str, Dict[Tuple, Dict[str, Any]]]):
+        self.tables = tables
+        self._result: List[Tuple] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql: str, params=None) -> None:
+        table = re.search(r"FROM (\w+)", sql).group(1)
+        rows = self.tables[table]
+        if "FOR UPDATE" in sql:
+            width = KEY_COLUMNS[table]
+            keys = [tuple(params[i:i + width]) for i in range(0, len(params), width)]
+            self._result = [
+                (date.fromisoformat(key[0]), *key[1:], rows[key]["latency_sketch"])
+                for key in keys if key in rows
+            ]
+            return
+        if table == "usage_course_daily" and "course = %s" in sql:
+            row = rows.get(tuple(params))
+            self._result = [] if row is None else [(
+                row["messages"], row["tokens"], row["active_chats"], row["latency_sketch"]
+            )]
+            return
+        raise AssertionError(f"Consulta no soportada por el cursor de prueba: {sql}")
+
+    def executemany(self, sql: str, values: List[Tuple]) -> None:
+        table = re.search(r"INSERT INTO (\w+)", sql).group(1)
+        width = KEY_COLUMNS[table]
+        for value in values:
+            key, counters, sketch = tuple(value[:width]), value[width:-1], value[-1]
+            row = self.tables[table].setdefault(
+                key, {"messages": 0, "tokens": 0, "active_chats": 0}
+            )
+            row["messages"] += counters[0]
+            row["tokens"] += counters[1]
+            if table == "usage_course_daily":
+                row["active_chats"] += counters[2]
+            row["latency_sketch"] = sketch
+
+    def fetchall(self) -> List[Tuple]:
+        return self._result
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+
+class FakeConnection:
+    " Conexión en memoria compatible con el uso 'with' de pymysql "
+    def __init__(self, tables):
+        self.tables = tables
+        self.commits = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self.tables)
+
+    def commit(self) -> None:
+        self.commits += 1
+
+
+class FakeConnectionManager:
+    " Reemplaza a DatabaseConnectionManager; puede simular caídas de la base "
+    def __init__(self):
+        self.tables = {"usage_chat_daily": {}, "usage_course_daily": {}}
+        self.failures = 0
+
+    def get_connection(self) -> FakeConnection:
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("Base de datos no disponible")
+        return FakeConnection(self.tables)
+
+
+def make_events(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    " Genera eventos crudos (día, chat, latencia, tokens) en varios días y cursos "
+    rng = random.Random(seed)
+    first_day = date(2026, 3, 2)
+    chats = [{"id": -100 - i, "type": "supergroup", "title": f"Curso {i % 3}"} for i in range(6)]
+    chats += [{"id": 500 + i, "type": "private"} for i in range(4)]
+    return [{
+        "day": first_day + timedelta(days=rng.randrange(3)),
+        "chat": rng.choice(chats),
+        "latency": rng.lognormvariate(0, 0.8),
+        "tokens": rng.randrange(0, 2000),
+    } for _ in range(count)]
+
+
+def recompute(service: UsageAnalyticsService,
+              events: List[Dict[str, Any]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    " Recalcula desde cero los rollups por (día, curso) a partir de los eventos crudos "
+    totals: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for event in events:
+        key = (event["day"].isoformat(), service.course_for(event["chat"]))
+        total = totals.setdefault(
+            key, {"messages": 0, "tokens": 0, "chats": set(), "sketch": LatencySketch()}
+        )
+        total["messages"] += 1
+        total["tokens"] += event["tokens"]
+        total["chats"].add(event["chat"]["id"])
+        total["sketch"].add(event["latency"] * 1000)
+    return totals
+
+
+def feed(service: UsageAnalyticsService, events: List[Dict[str, Any]]) -> None:
+    for event in events:
+        service.record(event["chat"], event["latency"], event["tokens"], day=event["day"])
+
+
+def assert_matches_recompute(repository: UsageAnalyticsRepository,
+                             service: UsageAnalyticsService,
+                             events: List[Dict[str, Any]]) -> None:
+    expected = recompute(service, events)
+    assert len(repository.connection_manager.tables["usage_course_daily"]) == len(expected)
+    for (day, course), total in expected.items():
+        summary = repository.get_course_day(day, course)
+        assert summary["messages"] == total["messages"]
+        assert summary["tokens"] == total["tokens"]
+        assert summary["active_chats"] == len(total["chats"])
+        assert summary["latency_p50_ms"] == total["sketch"].quantile(0.5)
+        assert summary["latency_p95_ms"] == total["sketch"].quantile(0.95)
+
+
+@pytest.fixture(name="repository")
+def fixture_repository() -> UsageAnalyticsRepository:
+    return UsageAnalyticsRepository(FakeConnectionManager(), LOGGER)
+
+
+def test_batches_match_full_recompute(repository):
+    service = UsageAnalyticsService(repository, LOGGER, batch_size=37,
+                                    courses={"500": "Curso 0"})
+    events = make_events(1000)
+    feed(service, events)
+    service.flush()
+
+    assert_matches_recompute(repository, service, events)
+
+
+def test_restore_after_failed_batch_keeps_every_update(repository):
+    service = UsageAnalyticsService(repository, LOGGER, batch_size=50)
+    events = make_events(400, seed=11)
+    repository.connection_manager.failures = 3
+    feed(service, events)
+    service.flush()
+
+    assert repository.connection_manager.failures == 0
+    assert_matches_recompute(repository, service, events)
+
+
+def test_percentiles_within_relative_accuracy(repository):
+    service = UsageAnalyticsService(repository, LOGGER, batch_size=25)
+    events = make_events(600, seed=3)
+    feed(service, events)
+    service.flush()
+
+    for (day, course), total in recompute(service, events).items():
+        latencies = sorted(
+            event["latency"] * 1000 for event in events
+            if event["day"].isoformat() == day and service.course_for(event["chat"]) == course
+        )
+        summary = repository.get_course_day(day, course)
+        for q, field in ((0.5, "latency_p50_ms"), (0.95, "latency_p95_ms")):
+            exact = latencies[int(q * (len(latencies) - 1))]
+            assert summary[field] == pytest.approx(exact, rel=total["sketch"].relative_accuracy)
+
+
+def test_sketch_merge_equals_single_sketch():
+    rng = random.Random(5)
+    values = [rng.expovariate(0.01) for _ in range(2000)] + [0.0] * 10
+    whole, left, right = LatencySketch(), LatencySketch(), LatencySketch()
+    for index, value in enumerate(values):
+        whole.add(value)
+        (left if index % 2 else right).add(value)
+
+    merged = left.merge(right)
+
+    assert merged.buckets == whole.buckets
+    assert merged.zero_count == whole.zero_count
+    assert merged.count == whole.count
+    for q in (0.0, 0.5, 0.95, 0.99, 1.0):
+        assert merged.quantile(q) == whole.quantile(q)
+
+
+def test_sketch_json_round_trip():
+    sketch = LatencySketch(relative_accuracy=0.01)
+    for value in (0.0, 0.4, 3.0, 3.1, 250.0, 9000.0):
+        sketch.add(value)
+
+    restored = LatencySketch.from_json(sketch.to_json())
+
+    assert restored.relative_accuracy == sketch.relative_accuracy
+    assert restored.buckets == sketch.buckets
+    assert restored.zero_count == sketch.zero_count
+    assert restored.count == sketch.count
+    assert restored.quantile(0.5) == sketch.quantile(0.5)
+    assert LatencySketch.from_json(restored.to_json()).to_json() == sketch.to_json()
+
+
+def test_sketch_empty_and_incompatible():
+    empty = LatencySketch.from_json(None)
+    assert empty.count == 0
+    assert empty.quantile(0.5) is None
+    with pytest.raises(ValueError):
+        LatencySketch(relative_accuracy=0.02).merge(LatencySketch(relative_accuracy=0.05))